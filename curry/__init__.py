@@ -0,0 +1,5 @@
+#==================================================================================================================================================================
+# Pacote compartilhado entre as páginas do dashboard ( ingestão e limpeza dos dados )
+#==================================================================================================================================================================
+from curry.limpeza import clean_code
+from curry.ingestao import CAMINHO_DADOS, carregar_dados, limpar_cache
@@ -0,0 +1,203 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import argparse
+import gc
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psutil
+
+from curry import metricas
+from curry.cubo import montar_cubo
+from curry.ingestao_blocos import agregar_csv_em_blocos
+from curry.limpeza import clean_code
+from curry.paralelo import limpar_intervalo
+from curry.sintetico import gerar_csv
+
+#==================================================================================================================================================================
+# Benchmark da leitura, limpeza e agregações das páginas
+#==================================================================================================================================================================
+#
+# Uso: python -m curry.benchmark [ --linhas 45000 1000000 10000000 ] [ --saida benchmark.json ] [ --comparar base.json ] [ --processos 8 ]
+#
+# Para cada tamanho um csv sintético ( curry.sintetico ) é gerado uma única vez na pasta de dados e cada
+# etapa é medida em sequência: tempo de parede, pico de RSS do processo durante a etapa e linhas/s
+# ( linhas do csv / segundos ). O resultado é gravado em JSON; com --comparar a razão de tempo em
+# relação a um resultado anterior é mostrada por ( tamanho, etapa ).
+#
+# As etapas 'streaming_*' medem o modo streaming ( CURRY_STREAMING, ver curry.ingestao_blocos ): o csv é
+# lido em blocos direto para os agregados e as métricas saem dos momentos, sem o dataframe limpo. Elas
+# rodam antes da leitura completa, para o pico de RSS não incluir o dataset carregado pelas demais etapas.
+
+TAMANHOS_PADRAO = [ 45_000, 1_000_000, 10_000_000 ]
+INTERVALO_AMOSTRA = 0.005
+
+class MedidorMemoria:
+    """Amostra o RSS do processo em uma thread enquanto o bloco "with" roda e guarda o pico"""
+
+    def __init__( self, intervalo=INTERVALO_AMOSTRA ):
+        self.intervalo = intervalo
+        self._processo = psutil.Process()
+        self._parar = threading.Event()
+
+    def __enter__( self ):
+        self.inicial = self.pico = self._processo.memory_info().rss
+        self._thread = threading.Thread( target=self._amostrar, daemon=True )
+        self._thread.start()
+        return self
+
+    def __exit__( self, *_ ):
+        self._parar.set()
+        self._thread.join()
+        self.final = self._processo.memory_info().rss
+        self.pico = max( self.pico, self.final )
+
+    def _amostrar( self ):
+        while not self._parar.wait( self.intervalo ):
+            self.pico = max( self.pico, self._processo.memory_info().rss )
+
+#==================================================================================================================================================================
+# Etapas medidas ( funções de curry.metricas usadas pelas páginas; sem estado de filtro, o cache não é usado )
+#==================================================================================================================================================================
+
+def _top_entregadores( df ):
+    return pd.concat( [ metricas.calc_top_entregadores( df, 'R', True ), metricas.calc_top_entregadores( df, 'L', False ) ] )
+
+def _tempo_medio_dp_cidade( df ):
+    return pd.concat( [ metricas.calc_tempo_medio_dp_cidade( df, tp ) for tp in [ 'barras', 'solar', 'tabela', 'pizza' ] ] )
+
+# ( nome, função( contexto ) -> resultado, chave onde o resultado é guardado no contexto ou None )
+ETAPAS = [
+    ( 'streaming_agregados', lambda c: agregar_csv_em_blocos( c['caminho'] ), 'agregados' ),
+    ( 'streaming_cubo', lambda c: c['agregados'].cubo(), None ),
+    ( 'streaming_top_entregadores', lambda c: _top_entregadores( c['agregados'].fatiar() ), None ),
+    ( 'streaming_tempo_medio_dp_cidade', lambda c: _tempo_medio_dp_cidade( c['agregados'].fatiar() ), None ),
+    ( 'leitura', lambda c: pd.read_csv( c['caminho'] ), 'bruto' ),
+    ( 'limpeza', lambda c: clean_code( c['bruto'] ), 'limpo' ),
+    ( 'cubo', lambda c: montar_cubo( c['limpo'] ), 'cubo' ),
+    ( 'pedidos_dia', lambda c: metricas.pedidos_dia( c['cubo'] ), None ),
+    ( 'pedidos_trafego', lambda c: metricas.pedidos_trafego( c['cubo'] ), None ),
+    ( 'pedidos_cidade_trafego', lambda c: metricas.pedidos_cidade_trafego( c['cubo'] ), None ),
+    ( 'pedidos_semana', lambda c: metricas.pedidos_semana( c['cubo'] ), None ),
+    ( 'pedidos_entregador_semana', lambda c: metricas.pedidos_entregador_semana( c['cubo'] ), None ),
+    ( 'pedidos_entregador_semana_exato', lambda c: metricas.pedidos_entregador_semana( c['cubo'], exato=True ), None ),
+    ( 'entregadores_unicos', lambda c: pd.DataFrame( [ metricas.entregadores_unicos( c['cubo'] ) ] ), None ),
+    ( 'entregadores_unicos_exato', lambda c: pd.DataFrame( [ metricas.entregadores_unicos( c['cubo'], exato=True ) ] ), None ),
+    ( 'calc_top_entregadores', lambda c: _top_entregadores( c['limpo'] ), None ),
+    ( 'calc_tempo_medio_dp_cidade', lambda c: _tempo_medio_dp_cidade( c['limpo'] ), None ),
+]
+
+def medir_etapa( funcao, contexto, repeticoes ):
+    """Executa a etapa "repeticoes" vezes e retorna ( último resultado, tempos em segundos, pico de RSS, RSS inicial )"""
+    tempos = []
+    pico = inicial = None
+
+    for _ in range( repeticoes ):
+        gc.collect()
+        with MedidorMemoria() as memoria:
+            inicio = time.perf_counter()
+            resultado = funcao( contexto )
+            tempos.append( time.perf_counter() - inicio )
+
+        pico = memoria.pico if pico is None else max( pico, memoria.pico )
+        inicial = memoria.inicial if inicial is None else inicial
+
+    return resultado, tempos, pico, inicial
+
+def caminho_dataset( pasta, linhas, semente ):
+    """Caminho do csv sintético de um tamanho; o arquivo é gerado apenas se ainda não existir"""
+    caminho = os.path.join( pasta, 'train_{}_{}.csv'.format( linhas, semente ) )
+
+    if not os.path.exists( caminho ):
+        os.makedirs( pasta, exist_ok=True )
+        temporario = caminho + '.tmp'
+        gerar_csv( temporario, linhas, semente )
+        os.replace( temporario, caminho )
+
+    return caminho
+
+def executar( tamanhos=TAMANHOS_PADRAO, pasta=None, semente=0, repeticoes=1, processos=1 ):
+    """Esta função roda todas as etapas para cada tamanho e retorna o resultado no formato gravado em JSON
+
+        Com processos > 1 também mede a leitura + limpeza paralela ( curry.paralelo ).
+    """
+    pasta = pasta or os.path.join( tempfile.gettempdir(), 'curry_benchmark' )
+    resultados = []
+
+    etapas = list( ETAPAS )
+    if processos > 1:
+        etapas.append( ( 'leitura_limpeza_paralela', lambda c: limpar_intervalo( c['caminho'], processos=processos )[0], None ) )
+
+    for linhas in tamanhos:
+        contexto = { 'caminho': caminho_dataset( pasta, linhas, semente ) }
+
+        for nome, funcao, chave in etapas:
+            resultado, tempos, pico, inicial = medir_etapa( funcao, contexto, repeticoes )
+            if chave is not None:
+                contexto[ chave ] = resultado
+
+            segundos = min( tempos )
+            resultados.append( { 'linhas': linhas,
+                                 'etapa': nome,
+                                 'segundos': segundos,
+                                 'segundos_repeticoes': tempos,
+                                 'linhas_por_segundo': linhas / segundos if segundos > 0 else None,
+                                 'pico_rss_mb': pico / 2**20,
+                                 'acrescimo_pico_rss_mb': ( pico - inicial ) / 2**20,
+                                 # o cubo é medido pelas linhas das contagens
+                                 'linhas_resultado': len( getattr( resultado, 'contagens', resultado ) ) } )
+
+        del contexto
+        gc.collect()
+
+    return { 'ambiente': { 'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                           'plataforma': platform.platform(), 'cpus': os.cpu_count(),
+                           'data': time.strftime( '%Y-%m-%dT%H:%M:%S' ), 'semente': semente, 'repeticoes': repeticoes, 'processos': processos },
+             'resultados': resultados }
+
+def comparar( atual, base ):
+    """Retorna { ( linhas, etapa ): segundos atual / segundos base } para as etapas presentes nos dois resultados"""
+    tempos_base = { ( r['linhas'], r['etapa'] ): r['segundos'] for r in base['resultados'] }
+
+    return { ( r['linhas'], r['etapa'] ): r['segundos'] / tempos_base[ ( r['linhas'], r['etapa'] ) ]
+             for r in atual['resultados'] if tempos_base.get( ( r['linhas'], r['etapa'] ) ) }
+
+def _imprimir( atual, razoes ):
+    print( '{:>10}  {:<34}{:>10}{:>14}{:>12}{:>10}'.format( 'linhas', 'etapa', 'segundos', 'linhas/s', 'pico MB', 'vs base' ) )
+    for r in atual['resultados']:
+        razao = razoes.get( ( r['linhas'], r['etapa'] ) )
+        print( '{:>10}  {:<34}{:>10.3f}{:>14,.0f}{:>12.1f}{:>10}'.format( r['linhas'], r['etapa'], r['segundos'], r['linhas_por_segundo'] or 0,
+                                                                         r['pico_rss_mb'], '' if razao is None else '{:.2f}x'.format( razao ) ) )
+
+def main( argumentos=None ):
+    parser = argparse.ArgumentParser( description='Benchmark da limpeza e das agregações do dashboard' )
+    parser.add_argument( '--linhas', type=int, nargs='+', default=TAMANHOS_PADRAO, help='tamanhos dos datasets sintéticos' )
+    parser.add_argument( '--pasta', default=None, help='pasta dos csv sintéticos ( reutilizados entre execuções )' )
+    parser.add_argument( '--semente', type=int, default=0 )
+    parser.add_argument( '--repeticoes', type=int, default=1, help='execuções por etapa ( o menor tempo é reportado )' )
+    parser.add_argument( '--processos', type=int, default=1, help='processos da etapa de limpeza paralela ( 1 = não medir )' )
+    parser.add_argument( '--saida', default='benchmark.json', help='arquivo JSON com os resultados' )
+    parser.add_argument( '--comparar', default=None, help='JSON de uma execução anterior para comparação' )
+    args = parser.parse_args( argumentos )
+
+    atual = executar( args.linhas, args.pasta, args.semente, args.repeticoes, args.processos )
+
+    with open( args.saida, 'w' ) as arquivo:
+        json.dump( atual, arquivo, indent=2, ensure_ascii=False )
+
+    razoes = {}
+    if args.comparar:
+        with open( args.comparar ) as arquivo:
+            razoes = comparar( atual, json.load( arquivo ) )
+
+    _imprimir( atual, razoes )
+
+if __name__ == '__main__':
+    main()
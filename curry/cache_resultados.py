@@ -0,0 +1,91 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import functools
+import threading
+from collections import OrderedDict
+
+#==================================================================================================================================================================
+# Cache LRU dos resultados das funções de agregação por estado dos filtros
+#==================================================================================================================================================================
+#
+# O dataframe devolvido por IndiceFiltros.filtrar carrega em df.attrs['estado_filtro'] a versão do arquivo
+# de origem e os filtros normalizados ( data limite, tráfegos ). Funções decoradas com @memorizar usam
+# esse estado + seus argumentos como chave, então a mesma combinação de filtros é calculada uma única
+# vez no processo, para todas as sessões do Streamlit.
+
+TAMANHO_PADRAO = 256
+
+class CacheResultados:
+    """Cache LRU limitado, seguro para threads, com contadores de acertos e falhas"""
+
+    def __init__( self, tamanho_maximo=TAMANHO_PADRAO ):
+        self.tamanho_maximo = tamanho_maximo
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter( self, chave, calcular ):
+        """Devolve o resultado em cache para a chave ou calcula, guarda e devolve"""
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end( chave )
+                self.acertos += 1
+                return self._itens[ chave ]
+
+            self.falhas += 1
+
+        # O cálculo roda fora do lock para não bloquear as outras sessões
+        resultado = calcular()
+
+        with self._lock:
+            self._itens[ chave ] = resultado
+            self._itens.move_to_end( chave )
+
+            while len( self._itens ) > self.tamanho_maximo:
+                self._itens.popitem( last=False )
+
+        return resultado
+
+    def limpar( self ):
+        """Descarta todos os resultados e zera os contadores"""
+        with self._lock:
+            self._itens.clear()
+            self.acertos = 0
+            self.falhas = 0
+
+    def estatisticas( self ):
+        """Retorna os contadores do cache em um dicionário"""
+        with self._lock:
+            return { 'acertos': self.acertos, 'falhas': self.falhas, 'itens': len( self._itens ), 'tamanho_maximo': self.tamanho_maximo }
+
+# Cache compartilhado por todas as páginas e sessões do processo
+cache_resultados = CacheResultados()
+
+def normalizar_filtro( versao, data_limite, trafegos ):
+    """Monta o estado normalizado dos filtros ( a ordem dos tráfegos selecionados não altera o resultado )"""
+    return ( versao, str( data_limite ), tuple( sorted( set( trafegos ) ) ) )
+
+def memorizar( funcao ):
+    """Decorador: guarda o resultado de funcao( df, *args ) por ( função, argumentos, df.attrs['estado_filtro'] )
+
+        O primeiro argumento pode ser um dataframe filtrado ( IndiceFiltros.filtrar ) ou um cubo fatiado
+        ( CuboPedidos.fatiar ). Objetos sem estado de filtro são calculados sem cache.
+        O resultado em cache é compartilhado e não deve ser alterado por quem o recebe.
+    """
+    # As páginas rodam como __main__: o arquivo de origem diferencia funções de mesmo nome
+    identificacao = ( funcao.__code__.co_filename, funcao.__qualname__ )
+
+    @functools.wraps( funcao )
+    def funcao_memorizada( df, *args, **kwargs ):
+        estado = getattr( df, 'attrs', {} ).get( 'estado_filtro' )
+
+        if estado is None:
+            return funcao( df, *args, **kwargs )
+
+        chave = ( identificacao, estado, args, tuple( sorted( kwargs.items() ) ) )
+
+        return cache_resultados.obter( chave, lambda: funcao( df, *args, **kwargs ) )
+
+    return funcao_memorizada
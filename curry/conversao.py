@@ -0,0 +1,73 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import numpy as np
+import pandas as pd
+
+#==================================================================================================================================================================
+# Conversão vetorizada das colunas de texto
+#==================================================================================================================================================================
+#
+# As colunas de texto do dataset têm poucos valores distintos ( ~45 tempos de entrega, 7 climas ).
+# Em vez de chamar uma função Python por linha, os valores são fatorados em códigos e apenas os
+# valores únicos são convertidos; o resultado volta para as linhas com um take() do NumPy.
+
+PREFIXO_TEMPO = '(min) '
+PREFIXO_CLIMA = 'conditions '
+
+def _converter_por_categorias( serie, conversor, valor_ausente ):
+    """Aplica "conversor" ( Index -> array ) somente aos valores únicos da série e expande o resultado para as linhas"""
+    codigos, unicos = pd.factorize( serie, sort=False )
+    convertidos = np.asarray( conversor( pd.Index( unicos ) ) )
+
+    # O código -1 ( valor ausente na série ) aponta para o último elemento
+    convertidos = np.append( convertidos, np.array( [ valor_ausente ], dtype=convertidos.dtype ) )
+
+    return convertidos[ codigos ]
+
+def converter_tempo_entrega( serie ):
+    """Esta função converte a coluna "Time_taken(min)" ( '(min) 24' ) para números inteiros
+
+        Retorna uma tupla ( valores, validos ): "valores" é um array float64 com NaN nas linhas
+        mal formatadas e "validos" é a máscara booleana das linhas convertidas com sucesso.
+        Valores mal formatados não geram exceção, apenas ficam fora da máscara.
+
+    """
+    def conversor( unicos ):
+        texto = unicos.astype( str )
+        com_prefixo = texto.str.startswith( PREFIXO_TEMPO )
+        numeros = pd.to_numeric( texto.str.slice( len( PREFIXO_TEMPO ) ).str.strip(), errors='coerce' )
+
+        return np.where( com_prefixo, numeros, np.nan ).astype( np.float64 )
+
+    valores = _converter_por_categorias( serie, conversor, np.nan ).astype( np.float64 )
+    validos = ~np.isnan( valores ) & ( np.mod( valores, 1 ) == 0 )
+
+    return valores, validos
+
+def converter_clima( serie ):
+    """Esta função remove o prefixo 'conditions ' da coluna "Weatherconditions" ( 'conditions Sunny' -> 'Sunny' )"""
+    def conversor( unicos ):
+        texto = unicos.astype( str )
+
+        return np.where( texto.str.startswith( PREFIXO_CLIMA ), texto.str.slice( len( PREFIXO_CLIMA ) ), texto ).astype( object )
+
+    return _converter_por_categorias( serie, conversor, None )
+
+def calendario_iso( datas ):
+    """Esta função calcula ano ISO, semana ISO ( 1-53 ) e dia da semana ( 0 = segunda ) das datas
+
+        Mesmo resultado do dt.isocalendar(), mas com aritmética inteira sobre os dias desde 1970-01-01
+        ( uma quinta-feira ), sem formatar texto por linha. Retorna três arrays ( int16, int8, int8 ).
+        A semana ISO pertence ao ano da sua quinta-feira.
+
+    """
+    dias = np.asarray( datas, dtype='datetime64[D]' ).astype( np.int64 )
+
+    dia_semana = ( dias + 3 ) % 7
+    quinta = dias - dia_semana + 3
+
+    ano = quinta.astype( 'datetime64[D]' ).astype( 'datetime64[Y]' )
+    semana = ( quinta - ano.astype( 'datetime64[D]' ).astype( np.int64 ) ) // 7 + 1
+
+    return ( ano.astype( np.int64 ) + 1970 ).astype( np.int16 ), semana.astype( np.int8 ), dia_semana.astype( np.int8 )
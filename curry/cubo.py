@@ -0,0 +1,161 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import numpy as np
+import pandas as pd
+
+from curry import hll
+from curry.cache_resultados import normalizar_filtro
+from curry.ingestao import CAMINHO_DADOS, carregar_dados, carregar_derivado, chave_arquivo
+from curry.instrumentacao import instrumentar
+
+#==================================================================================================================================================================
+# Cubo de pedidos pré-agregado ( Visão Empresa )
+#==================================================================================================================================================================
+#
+# Os gráficos da Visão Empresa só precisam de contagens por dia, semana, cidade e tipo de tráfego e da
+# quantidade de entregadores distintos por semana. O cubo é calculado uma única vez após a limpeza e os
+# filtros da barra lateral ( data < slider, tráfego em multiselect ) viram fatias do cubo, cujo tamanho
+# depende da quantidade de dias x cidades x tráfegos e não da quantidade de pedidos.
+#
+# Entregadores distintos não são somáveis entre células: cada linha das contagens ( dia x cidade x tráfego )
+# tem também um esboço HyperLogLog dos entregadores ( curry.hll ), e a contagem distinta de qualquer fatia
+# combina os esboços em vez de montar o conjunto de entregadores. Os pares distintos continuam guardados
+# para a contagem exata ( exato=True ou CURRY_DISTINTOS_EXATOS=1 ).
+
+# Semana ISO ( colunas de calendário criadas pelo clean_code )
+SEMANA = [ 'Order_Year', 'Order_Week' ]
+
+# Chaves das contagens e dos pares distintos de entregadores; as colunas da semana dependem só da data
+# e entram nas chaves apenas para chegarem prontas ao cubo
+CHAVES_CONTAGENS = [ 'Order_Date' ] + SEMANA + [ 'City', 'Road_traffic_density' ]
+CHAVES_ENTREGADORES = [ 'Order_Date' ] + SEMANA + [ 'Road_traffic_density', 'Delivery_person_ID' ]
+
+COLUNAS_CUBO = [ 'Order_Date' ] + SEMANA + [ 'City', 'Road_traffic_density', 'Delivery_person_ID' ]
+
+class CuboPedidos:
+    """Agregados de pedidos por dia x cidade x tráfego
+
+        contagens: uma linha por ( Order_Date, City, Road_traffic_density ) com a semana ISO e Qtde_Pedidos
+        entregadores: pares distintos ( Order_Date, Road_traffic_density, Delivery_person_ID ) com a semana ISO,
+                      usados para contar entregadores distintos por semana ( contagem distinta não é somável )
+        attrs: 'versao' do dataset de origem e, nas fatias, o 'estado_filtro' usado pelo cache de resultados
+        esbocos: matriz HyperLogLog dos entregadores, uma linha por linha de "contagens" ( None = só contagem exata )
+    """
+
+    def __init__( self, contagens, entregadores, attrs=None, esbocos=None ):
+        self.contagens = contagens
+        self.entregadores = entregadores
+        self.attrs = dict( attrs or {} )
+        self.esbocos = esbocos
+
+    @instrumentar( nome='filtro.cubo' )
+    def fatiar( self, data_limite, trafegos ):
+        """Aplica os filtros da barra lateral ( Order_Date < data_limite e tráfego em "trafegos" ) ao cubo"""
+        linhas = ( self.contagens['Order_Date'] < data_limite ) & self.contagens['Road_traffic_density'].isin( trafegos )
+        linhas_entregadores = ( self.entregadores['Order_Date'] < data_limite ) & self.entregadores['Road_traffic_density'].isin( trafegos )
+
+        attrs = dict( self.attrs, estado_filtro=normalizar_filtro( self.attrs.get( 'versao' ), data_limite, trafegos ) )
+
+        esbocos = None if self.esbocos is None else self.esbocos[ linhas.to_numpy() ]
+
+        return CuboPedidos( self.contagens.loc[ linhas, : ], self.entregadores.loc[ linhas_entregadores, : ], attrs, esbocos )
+
+    def pedidos_por( self, dimensoes ):
+        """Soma as contagens de pedidos pelas dimensões informadas"""
+        return ( self.contagens.groupby( dimensoes, observed=True )['Qtde_Pedidos'].sum()
+                               .reset_index()
+                               .sort_values( dimensoes, ignore_index=True ) )
+
+    def contagem_exata( self, exato=None ):
+        """Diz se as contagens distintas serão exatas: exato=None segue CURRY_DISTINTOS_EXATOS ( sem esboços, sempre exatas )"""
+        return ( hll.EXATO if exato is None else exato ) or self.esbocos is None
+
+    def entregadores_por_semana( self, exato=None ):
+        """Conta os entregadores distintos por semana ( estimativa HyperLogLog, ou exata com exato=True )"""
+        if self.contagem_exata( exato ):
+            return self.entregadores.groupby( SEMANA )['Delivery_person_ID'].nunique().reset_index()
+
+        grupos = self.contagens.groupby( SEMANA )
+        semanas = grupos.size().reset_index().loc[ :, SEMANA ]
+        registros = hll.combinar( self.esbocos, grupos.ngroup().to_numpy(), len( semanas ) )
+        semanas['Delivery_person_ID'] = np.rint( hll.estimar( registros ) ).astype( np.int64 )
+
+        return semanas
+
+    def entregadores_distintos( self, exato=None ):
+        """Conta os entregadores distintos da fatia ( estimativa HyperLogLog, ou exata com exato=True )"""
+        if self.contagem_exata( exato ):
+            return int( self.entregadores['Delivery_person_ID'].nunique() )
+
+        return int( np.rint( hll.estimar( self.esbocos.max( axis=0, initial=0 ) ) ) )
+
+def rotulo_semana( df ):
+    """Rótulo 'AAAA-Snn' da semana ISO de um resultado agrupado por SEMANA ( ordena corretamente entre anos )"""
+    return df['Order_Year'].astype( str ) + '-S' + df['Order_Week'].astype( str ).str.zfill( 2 )
+
+def contagens_com_esbocos( df ):
+    """Calcula as contagens ( CHAVES_CONTAGENS + Qtde_Pedidos ) e o esboço dos entregadores de cada linha"""
+    grupos = df.groupby( CHAVES_CONTAGENS, observed=True )
+    contagens = grupos.size().rename( 'Qtde_Pedidos' ).reset_index()
+
+    # Linhas com chave ausente ficam fora dos grupos ( ngroup NaN -> -1, ignoradas pelo esboço )
+    return contagens, hll.esbocos( grupos.ngroup().fillna( -1 ).to_numpy(), len( contagens ), df['Delivery_person_ID'] )
+
+def combinar_contagens( contagens, esbocos ):
+    """Junta as linhas de mesmas chaves: soma as contagens e combina os esboços ( ingestão em blocos )"""
+    grupos = contagens.groupby( CHAVES_CONTAGENS, observed=True )
+    somadas = grupos['Qtde_Pedidos'].sum().reset_index()
+
+    return somadas, hll.combinar( esbocos, grupos.ngroup().to_numpy(), len( somadas ) )
+
+def cubo_de_agregados( contagens, entregadores, esbocos=None ):
+    """Monta o cubo a partir das contagens ( CHAVES_CONTAGENS + Qtde_Pedidos ), dos pares distintos
+    ( CHAVES_ENTREGADORES ) e dos esboços ( alinhados às contagens ) já calculados"""
+    contagens = contagens.reset_index( drop=True )
+
+    entregadores = entregadores.reset_index( drop=True )
+    entregadores['Delivery_person_ID'] = entregadores['Delivery_person_ID'].astype( 'category' )
+
+    return CuboPedidos( contagens, entregadores, esbocos=esbocos )
+
+def montar_cubo( df ):
+    """Esta função calcula o cubo de pedidos a partir do dataframe limpo"""
+    contagens, esbocos = contagens_com_esbocos( df )
+    entregadores = df.loc[ :, CHAVES_ENTREGADORES ].drop_duplicates()
+
+    return cubo_de_agregados( contagens, entregadores, esbocos )
+
+def anexar_cubo( cubo, df ):
+    """Esta função soma ao cubo as linhas limpas de "df" ( ex.: linhas anexadas ao csv ) sem recalcular o cubo inteiro
+
+        As contagens das chaves repetidas são somadas e os esboços combinados; os pares distintos de
+        entregadores são unidos. O resultado é o mesmo do montar_cubo sobre todas as linhas.
+    """
+    contagens, esbocos = contagens_com_esbocos( df )
+    contagens, esbocos = combinar_contagens( pd.concat( [ cubo.contagens, contagens ], ignore_index=True ),
+                                             np.concatenate( [ cubo.esbocos, esbocos ] ) )
+    entregadores = pd.concat( [ cubo.entregadores, df.loc[ :, CHAVES_ENTREGADORES ] ], ignore_index=True ).drop_duplicates()
+
+    return cubo_de_agregados( contagens, entregadores, esbocos )
+
+def carregar_cubo( caminho=CAMINHO_DADOS ):
+    """Esta função devolve o cubo de pedidos do dataset, calculado uma única vez por versão do arquivo
+
+        Quando o csv só recebeu linhas novas, o cubo da versão anterior é atualizado com elas ( anexar_cubo ).
+    """
+    def construir():
+        cubo = montar_cubo( carregar_dados( caminho, colunas=COLUNAS_CUBO ) )
+        cubo.attrs['versao'] = chave_arquivo( caminho )
+        return cubo
+
+    def anexar( cubo, linhas_novas, no_fim ):
+        # Sem esboços ( cubo montado só para a contagem exata ) o cubo é refeito
+        if cubo.esbocos is None:
+            return None
+
+        cubo = anexar_cubo( cubo, linhas_novas )
+        cubo.attrs['versao'] = chave_arquivo( caminho )
+        return cubo
+
+    return carregar_derivado( caminho, 'cubo_pedidos', construir, anexar )
@@ -0,0 +1,54 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import numpy as np
+
+#==================================================================================================================================================================
+# Distância geográfica ( haversine ) vetorizada com NumPy
+#==================================================================================================================================================================
+
+# Mesmo raio médio da Terra usado pela biblioteca haversine ( Unit.KILOMETERS )
+RAIO_TERRA_KM = 6371.0088
+
+# Quantidade padrão de linhas por bloco: limita a memória dos arrays temporários
+TAMANHO_BLOCO_PADRAO = 1_000_000
+
+def _haversine_bloco( lat1, lon1, lat2, lon2, saida ):
+    """Calcula a distância de um bloco de coordenadas ( em graus ) e grava o resultado em "saida" """
+    lat1 = np.radians( lat1 )
+    lat2 = np.radians( lat2 )
+    dlat = lat2 - lat1
+    dlon = np.radians( lon2 ) - np.radians( lon1 )
+
+    d = np.sin( dlat * 0.5 ) ** 2 + np.cos( lat1 ) * np.cos( lat2 ) * np.sin( dlon * 0.5 ) ** 2
+    np.multiply( 2 * RAIO_TERRA_KM, np.arcsin( np.sqrt( d ) ), out=saida )
+
+def haversine_vetorizado( lat1, lon1, lat2, lon2, tamanho_bloco=TAMANHO_BLOCO_PADRAO ):
+    """Esta função calcula a distância em km entre dois arrays de pontos de uma só vez
+
+        Equivale a chamar haversine( (lat1, lon1), (lat2, lon2) ) linha a linha, mas sem chamadas
+        Python por linha. O cálculo é feito em blocos de "tamanho_bloco" linhas para que o pico de
+        memória dos arrays intermediários não cresça com o tamanho do dataset
+        ( tamanho_bloco=None calcula tudo em um único bloco ).
+
+    """
+    lat1 = np.asarray( lat1, dtype=np.float64 )
+    lon1 = np.asarray( lon1, dtype=np.float64 )
+    lat2 = np.asarray( lat2, dtype=np.float64 )
+    lon2 = np.asarray( lon2, dtype=np.float64 )
+
+    n = len( lat1 )
+    distancia = np.empty( n, dtype=np.float64 )
+
+    if tamanho_bloco is None or tamanho_bloco >= n:
+        _haversine_bloco( lat1, lon1, lat2, lon2, distancia )
+        return distancia
+
+    if tamanho_bloco <= 0:
+        raise ValueError( 'tamanho_bloco deve ser maior que zero' )
+
+    for inicio in range( 0, n, tamanho_bloco ):
+        fim = inicio + tamanho_bloco
+        _haversine_bloco( lat1[inicio:fim], lon1[inicio:fim], lat2[inicio:fim], lon2[inicio:fim], distancia[inicio:fim] )
+
+    return distancia
@@ -0,0 +1,160 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from curry.distancia import RAIO_TERRA_KM
+from curry.ingestao import CAMINHO_DADOS, carregar_dados, carregar_derivado
+
+#==================================================================================================================================================================
+# Índice espacial dos restaurantes e dos endereços de entrega
+#==================================================================================================================================================================
+#
+# BallTree com métrica haversine sobre as coordenadas em radianos: consultas de raio ( "entregas a até X km
+# deste restaurante" ) e de k vizinhos ( "restaurante mais próximo deste endereço" ) sem varrer todas as
+# linhas nem chamar haversine por par. O índice é montado uma única vez por versão do dataset.
+#
+# Linhas anexadas ao csv ( no fim do dataset ordenado ) entram em árvores novas, só com os pontos novos,
+# consultadas junto com as anteriores; com MAXIMO_ARVORES árvores o índice é remontado em uma só.
+
+COLUNAS_ESPACIAL = [ 'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude',
+                     'City', 'Distance_km' ]
+
+MAXIMO_ARVORES = 8
+
+def _arvore( latitudes, longitudes ):
+    """BallTree ( haversine ) das coordenadas em graus"""
+    return BallTree( np.radians( np.column_stack( [ latitudes, longitudes ] ) ), metric='haversine' )
+
+class IndiceEspacial:
+    """BallTrees ( haversine ) sobre um conjunto de pontos; "posicoes" liga cada ponto à linha de origem
+
+        "arvores" é a lista de ( primeiro ponto, árvore ) de cada faixa de pontos ( ver anexar ).
+    """
+
+    def __init__( self, latitudes, longitudes, posicoes, arvores=None ):
+        self.latitudes = np.asarray( latitudes, dtype=np.float64 )
+        self.longitudes = np.asarray( longitudes, dtype=np.float64 )
+        self.posicoes = np.asarray( posicoes )
+        self._arvores = [ ( 0, _arvore( self.latitudes, self.longitudes ) ) ] if arvores is None else arvores
+
+    def __len__( self ):
+        return len( self.posicoes )
+
+    def anexar( self, latitudes, longitudes, posicoes ):
+        """Retorna o índice com os pontos novos, em uma árvore própria ( as árvores existentes são reaproveitadas )"""
+        inicio = len( self )
+        latitudes = np.concatenate( [ self.latitudes, np.asarray( latitudes, dtype=np.float64 ) ] )
+        longitudes = np.concatenate( [ self.longitudes, np.asarray( longitudes, dtype=np.float64 ) ] )
+        posicoes = np.concatenate( [ self.posicoes, np.asarray( posicoes ) ] )
+
+        if len( posicoes ) == inicio:
+            return IndiceEspacial( latitudes, longitudes, posicoes, self._arvores )
+        if len( self._arvores ) >= MAXIMO_ARVORES or inicio == 0:
+            return IndiceEspacial( latitudes, longitudes, posicoes )
+
+        return IndiceEspacial( latitudes, longitudes, posicoes,
+                               self._arvores + [ ( inicio, _arvore( latitudes[ inicio: ], longitudes[ inicio: ] ) ) ] )
+
+    def _juntar( self, indices, distancias, k=None ):
+        """Junta os resultados das árvores ( índices locais + primeiro ponto de cada árvore ) do mais próximo ao mais distante"""
+        indices, distancias = np.concatenate( indices ), np.concatenate( distancias )
+        ordem = np.argsort( distancias, kind='stable' )[ :k ]
+
+        return self.posicoes[ indices[ ordem ] ], distancias[ ordem ] * RAIO_TERRA_KM
+
+    def no_raio( self, latitude, longitude, raio_km ):
+        """Retorna ( posicoes, distancias_km ) dos pontos a até "raio_km" do ponto, do mais próximo ao mais distante"""
+        ponto = np.radians( [ [ latitude, longitude ] ] )
+        indices, distancias = [], []
+
+        for inicio, arvore in self._arvores:
+            indices_arvore, distancias_arvore = arvore.query_radius( ponto, r=raio_km / RAIO_TERRA_KM, return_distance=True, sort_results=True )
+            indices.append( inicio + indices_arvore[0] )
+            distancias.append( distancias_arvore[0] )
+
+        return self._juntar( indices, distancias )
+
+    def mais_proximos( self, latitude, longitude, k=1 ):
+        """Retorna ( posicoes, distancias_km ) dos k pontos mais próximos do ponto"""
+        ponto = np.radians( [ [ latitude, longitude ] ] )
+        indices, distancias = [], []
+
+        # Os k mais próximos de cada árvore contêm os k mais próximos de todas
+        for ( inicio, arvore ), fim in zip( self._arvores, [ i for i, _ in self._arvores[1:] ] + [ len( self ) ] ):
+            distancias_arvore, indices_arvore = arvore.query( ponto, k=min( k, fim - inicio ) )
+            indices.append( inicio + indices_arvore[0] )
+            distancias.append( distancias_arvore[0] )
+
+        return self._juntar( indices, distancias, k )
+
+class IndicesEspaciais:
+    """Índices dos restaurantes ( coordenadas distintas ) e das entregas ( uma por linha ) de um dataframe limpo
+
+        restaurantes.posicoes aponta para a primeira linha de cada restaurante; entregas.posicoes para a própria linha.
+        "dados" guarda as colunas de COLUNAS_ESPACIAL, na mesma ordem de linhas do dataset limpo.
+    """
+
+    def __init__( self, dados, restaurantes=None, entregas=None ):
+        self.dados = dados
+
+        if restaurantes is None:
+            coordenadas = dados.loc[ :, [ 'Restaurant_latitude', 'Restaurant_longitude' ] ].to_numpy()
+            _, primeiras = np.unique( coordenadas, axis=0, return_index=True )
+            restaurantes = IndiceEspacial( coordenadas[ primeiras, 0 ], coordenadas[ primeiras, 1 ], primeiras )
+
+        if entregas is None:
+            entregas = IndiceEspacial( dados[ 'Delivery_location_latitude' ], dados[ 'Delivery_location_longitude' ], np.arange( len( dados ) ) )
+
+        self.restaurantes = restaurantes
+        self.entregas = entregas
+
+    def anexar( self, novos ):
+        """Retorna os índices com as linhas "novos" acrescentadas ao fim do dataset ( só os pontos novos entram nas árvores )"""
+        inicio = len( self.dados )
+        novos = novos.loc[ :, COLUNAS_ESPACIAL ]
+
+        # Restaurantes ainda não indexados, pela primeira linha em que aparecem
+        conhecidos = set( zip( self.restaurantes.latitudes.tolist(), self.restaurantes.longitudes.tolist() ) )
+        coordenadas = novos.loc[ :, [ 'Restaurant_latitude', 'Restaurant_longitude' ] ].to_numpy()
+        _, primeiras = np.unique( coordenadas, axis=0, return_index=True )
+        primeiras = np.array( [ p for p in np.sort( primeiras ) if tuple( coordenadas[ p ].tolist() ) not in conhecidos ], dtype=np.int64 )
+
+        restaurantes = self.restaurantes.anexar( coordenadas[ primeiras, 0 ], coordenadas[ primeiras, 1 ], inicio + primeiras )
+        entregas = self.entregas.anexar( novos[ 'Delivery_location_latitude' ], novos[ 'Delivery_location_longitude' ],
+                                         inicio + np.arange( len( novos ) ) )
+
+        return IndicesEspaciais( pd.concat( [ self.dados, novos ] ), restaurantes, entregas )
+
+    def entregas_no_raio( self, latitude, longitude, raio_km, posicoes_validas=None ):
+        """Entregas a até "raio_km" do ponto; "posicoes_validas" ( ex.: IndiceFiltros.posicoes ) restringe às linhas filtradas"""
+        posicoes, distancias = self.entregas.no_raio( latitude, longitude, raio_km )
+
+        if posicoes_validas is not None:
+            manter = np.isin( posicoes, posicoes_validas, assume_unique=True )
+            posicoes, distancias = posicoes[ manter ], distancias[ manter ]
+
+        resultado = self.dados.take( posicoes ).reset_index( drop=True )
+        resultado[ 'Distancia_ponto_km' ] = distancias
+
+        return resultado
+
+    def restaurantes_mais_proximos( self, latitude, longitude, k=1 ):
+        """Os k restaurantes mais próximos do ponto ( ex.: um endereço de entrega )"""
+        posicoes, distancias = self.restaurantes.mais_proximos( latitude, longitude, k )
+
+        resultado = self.dados.loc[ :, [ 'Restaurant_latitude', 'Restaurant_longitude', 'City' ] ].take( posicoes ).reset_index( drop=True )
+        resultado[ 'Distancia_ponto_km' ] = distancias
+
+        return resultado
+
+def carregar_indices_espaciais( caminho=CAMINHO_DADOS ):
+    """Esta função devolve os índices espaciais do dataset, montados uma única vez por versão do arquivo
+
+        Quando o csv só recebeu linhas novas, no fim do dataset ordenado, os índices anteriores são estendidos
+        ( IndicesEspaciais.anexar ).
+    """
+    return carregar_derivado( caminho, 'indices_espaciais', lambda: IndicesEspaciais( carregar_dados( caminho, colunas=COLUNAS_ESPACIAL ) ),
+                              lambda indices, linhas_novas, no_fim: indices.anexar( linhas_novas ) if no_fim else None )
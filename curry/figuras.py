@@ -0,0 +1,85 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import hashlib
+import json
+
+import pandas as pd
+import plotly.utils
+import streamlit as st
+
+from curry.cache_resultados import CacheResultados
+
+#==================================================================================================================================================================
+# Cache das figuras Plotly já serializadas
+#==================================================================================================================================================================
+#
+# A cada rerun o st.plotly_chart converte a figura em dicionário ( to_dict ) e a serializa em JSON, e a
+# página ainda precisa montar a figura ( px.bar, px.sunburst... ). Aqui o JSON da figura fica em cache pela
+# identificação do gráfico + hash do dataframe agregado que a origina: filtros diferentes que chegam aos
+# mesmos números ( em qualquer página ou sessão ) reaproveitam o mesmo JSON, e o plotly_chart deste módulo
+# envia esse JSON direto para o frontend, sem montar nem serializar a figura novamente.
+#
+# "construir" deve depender apenas do dataframe recebido: a identificação do gráfico distingue as
+# figuras montadas a partir dos mesmos dados.
+#
+# O envio direto do JSON usa internos do Streamlit ( o proto PlotlyChart, st._main._enqueue e os valores
+# padrão do config ) na forma do streamlit==1.21.0 fixado no requirements.txt. Em outra versão o
+# plotly_chart volta para o st.plotly_chart público com o dicionário da figura ( sem o ganho da serialização,
+# mas ainda sem montar a figura ): ao atualizar o Streamlit, conferir o st.plotly_chart da nova versão antes
+# de ampliar VERSOES_PROTO.
+
+TAMANHO_CACHE_FIGURAS = 128
+
+VERSOES_PROTO = ( '1.21.', )
+ENVIO_DIRETO = st.__version__.startswith( VERSOES_PROTO )
+
+# Compartilhado por todas as páginas e sessões do processo
+cache_figuras = CacheResultados( TAMANHO_CACHE_FIGURAS )
+
+class FiguraSerializada:
+    """JSON de uma figura Plotly ( "spec" ), no mesmo formato gerado pelo st.plotly_chart"""
+
+    def __init__( self, spec ):
+        self.spec = spec
+
+def hash_dataframe( df ):
+    """Hash do conteúdo do dataframe: nomes e tipos das colunas, índice e valores"""
+    hash_df = hashlib.sha1( repr( [ ( str( c ), str( t ) ) for c, t in df.dtypes.items() ] ).encode( 'utf-8' ) )
+    hash_df.update( pd.util.hash_pandas_object( df, index=True ).to_numpy().tobytes() )
+
+    return hash_df.hexdigest()
+
+def figura( id_grafico, df, construir ):
+    """Devolve a FiguraSerializada de construir( df ), montada e serializada uma única vez por ( id_grafico, conteúdo de df )"""
+    def serializar():
+        return FiguraSerializada( json.dumps( construir( df ).to_dict(), cls=plotly.utils.PlotlyJSONEncoder ) )
+
+    return cache_figuras.obter( ( id_grafico, hash_dataframe( df ) ), serializar )
+
+def plotly_chart( figura_ou_dados, use_container_width=False, theme='streamlit', **kwargs ):
+    """Substituto do st.plotly_chart que aceita uma FiguraSerializada ( outras figuras vão para o st.plotly_chart )
+
+        Com ENVIO_DIRETO o JSON em cache é gravado direto no proto do gráfico e enviado para o container ativo
+        ( colunas, containers ), como faz o st.plotly_chart depois de serializar a figura.
+    """
+    if not isinstance( figura_ou_dados, FiguraSerializada ):
+        return st.plotly_chart( figura_ou_dados, use_container_width=use_container_width, theme=theme, **kwargs )
+
+    if not ENVIO_DIRETO:
+        return st.plotly_chart( json.loads( figura_ou_dados.spec ), use_container_width=use_container_width, theme=theme, **kwargs )
+
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+
+    proto = PlotlyChartProto()
+    proto.use_container_width = use_container_width
+    proto.figure.spec = figura_ou_dados.spec
+    # Mesmos padrões do st.plotly_chart do streamlit 1.21 ( streamlit/elements/plotly_chart.py )
+    configuracao = dict( kwargs.get( 'config', {} ) )
+    configuracao.setdefault( 'showLink', False )
+    configuracao.setdefault( 'linkText', False )
+    proto.figure.config = json.dumps( configuracao )
+    proto.theme = theme or ''
+
+    # st._main resolve o container ativo do "with" ( mesma chamada usada pelo st.plotly_chart no streamlit 1.21 )
+    return st._main._enqueue( 'plotly_chart', proto )
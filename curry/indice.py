@@ -0,0 +1,112 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import numpy as np
+import pandas as pd
+
+from curry.cache_resultados import normalizar_filtro
+from curry.ingestao import CAMINHO_DADOS, carregar_dados, carregar_derivado, chave_arquivo
+from curry.instrumentacao import instrumentar
+
+#==================================================================================================================================================================
+# Índice dos filtros da barra lateral ( data e tráfego )
+#==================================================================================================================================================================
+#
+# O dataset limpo vem ordenado por "Order_Date" ( passo 11 do clean_code ). Assim o filtro de data
+# ( Order_Date < slider ) vira uma busca binária que devolve o fim de um prefixo das linhas, e o filtro
+# de tráfego usa as listas pré-calculadas de posições de cada nível, sem varrer as colunas.
+#
+# Cada lista de posições já está ordenada: um nível é apenas um recorte da lista, todos os níveis usam a
+# lista de todas as linhas calculada na montagem do índice e os demais casos juntam as listas com o
+# merge do timsort ( sort estável sobre sequências já ordenadas: O( n log k ) para k níveis ).
+
+class IndiceFiltros:
+    """Datas ordenadas e posições das linhas de cada nível de tráfego de um dataframe limpo
+
+        "versao" identifica o dataset de origem ( chave do arquivo ) no estado de filtro gravado em
+        df.attrs['estado_filtro'], usado pelo cache de resultados ( curry.cache_resultados ).
+    """
+
+    def __init__( self, datas, posicoes_trafego, versao=None ):
+        self.datas = datas
+        self.posicoes_trafego = posicoes_trafego
+        self.versao = versao
+
+        # Posições de todas as linhas com tráfego válido ( filtro com todos os níveis selecionados )
+        self.posicoes_todas = self._juntar( list( posicoes_trafego.values() ) )
+
+    @staticmethod
+    def _juntar( partes ):
+        """Junta listas de posições ordenadas e disjuntas em uma única lista ordenada"""
+        if not partes:
+            return np.empty( 0, dtype=np.int64 )
+        if len( partes ) == 1:
+            return partes[0]
+
+        # O sort estável ( timsort ) encontra as sequências já ordenadas e apenas as intercala
+        return np.sort( np.concatenate( partes ), kind='stable' )
+
+    def posicoes( self, data_limite, trafegos ):
+        """Retorna as posições ( ordenadas ) das linhas com Order_Date < data_limite e tráfego em "trafegos" """
+        fim = np.searchsorted( self.datas, np.datetime64( pd.Timestamp( data_limite ), 'ns' ), side='left' )
+
+        selecionados = [ t for t in dict.fromkeys( trafegos ) if t in self.posicoes_trafego ]
+
+        if len( selecionados ) == len( self.posicoes_trafego ):
+            posicoes = self.posicoes_todas
+            return posicoes[ :np.searchsorted( posicoes, fim ) ]
+
+        # Os níveis são disjuntos: intercalar os recortes mantém a ordem por data das linhas
+        return self._juntar( [ p[ :np.searchsorted( p, fim ) ] for p in ( self.posicoes_trafego[ t ] for t in selecionados ) ] )
+
+    @instrumentar( nome='filtro.indice' )
+    def filtrar( self, df, data_limite, trafegos ):
+        """Aplica os filtros de data e tráfego ao dataframe indexado ( mesmas linhas, qualquer projeção de colunas )"""
+        if len( df ) != len( self.datas ):
+            raise ValueError( 'O dataframe não corresponde ao índice ( quantidade de linhas diferente )' )
+
+        df_filtrado = df.take( self.posicoes( data_limite, trafegos ) )
+        df_filtrado.attrs['estado_filtro'] = normalizar_filtro( self.versao, data_limite, trafegos )
+
+        return df_filtrado
+
+def montar_indice( df, versao=None ):
+    """Esta função monta o índice de filtros de um dataframe limpo ( ordenado por Order_Date )"""
+    datas = df['Order_Date'].to_numpy( dtype='datetime64[ns]' )
+
+    if len( datas ) > 1 and ( datas[1:] < datas[:-1] ).any():
+        raise ValueError( 'O dataframe precisa estar ordenado por Order_Date' )
+
+    codigos = df['Road_traffic_density'].cat.codes.to_numpy()
+    posicoes_trafego = { trafego: np.flatnonzero( codigos == i )
+                         for i, trafego in enumerate( df['Road_traffic_density'].cat.categories ) }
+
+    return IndiceFiltros( datas, posicoes_trafego, versao )
+
+def anexar_indice( indice, df, versao=None ):
+    """Esta função estende o índice com linhas limpas ( ordenadas por Order_Date ) que ficam no fim do dataset
+
+        As posições das linhas novas continuam a numeração do índice; nenhuma lista é recalculada.
+    """
+    inicio = len( indice.datas )
+    datas = df['Order_Date'].to_numpy( dtype='datetime64[ns]' )
+
+    if len( datas ) and len( indice.datas ) and datas[0] < indice.datas[-1]:
+        raise ValueError( 'As linhas anexadas precisam ter datas a partir da última data do índice' )
+
+    codigos = df['Road_traffic_density'].cat.codes.to_numpy()
+    vazio = np.empty( 0, dtype=np.int64 )
+    posicoes_trafego = { trafego: np.concatenate( [ indice.posicoes_trafego.get( trafego, vazio ), inicio + np.flatnonzero( codigos == i ) ] )
+                         for i, trafego in enumerate( df['Road_traffic_density'].cat.categories ) }
+
+    return IndiceFiltros( np.concatenate( [ indice.datas, datas ] ), posicoes_trafego, versao )
+
+def carregar_indice( caminho=CAMINHO_DADOS ):
+    """Esta função devolve o índice de filtros do dataset, calculado uma única vez por versão do arquivo
+
+        Quando o csv só recebeu linhas novas, com datas a partir da última, o índice anterior é estendido ( anexar_indice ).
+    """
+    return carregar_derivado( caminho, 'indice_filtros',
+                              lambda: montar_indice( carregar_dados( caminho, colunas=[ 'Order_Date', 'Road_traffic_density' ] ),
+                                                     versao=chave_arquivo( caminho ) ),
+                              lambda indice, linhas_novas, no_fim: anexar_indice( indice, linhas_novas, chave_arquivo( caminho ) ) if no_fim else None )
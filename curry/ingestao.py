@@ -0,0 +1,402 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import json
+import logging
+import os
+import threading
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from curry.instrumentacao import anotar, etapa
+from curry.leitura import fim_ultima_linha, registrar_leitura, situacao_leitura
+from curry.limpeza import VERSAO_LIMPEZA, economia_categorias, somar_attrs
+from curry.paralelo import limpar_intervalo
+
+#==================================================================================================================================================================
+# Cache colunar em disco ( Parquet ) do dataset limpo
+#==================================================================================================================================================================
+#
+# O resultado do clean_code é gravado ao lado do csv ( dataset/train.csv -> dataset/train.clean.parquet ).
+# Nas próximas inicializações o parquet é lido no lugar do csv, já com os tipos corretos e apenas com
+# as colunas pedidas. O parquet é refeito quando a versão da limpeza gravada nos metadados é diferente
+# de VERSAO_LIMPEZA ou quando o csv foi reescrito ( ver curry.leitura.situacao_leitura ).
+#
+# Ingestão incremental: os metadados guardam até qual byte do csv já foi lido ( fim de uma linha completa ),
+# quantas linhas brutas foram lidas, assinaturas do começo do arquivo e do trecho que termina no último byte
+# lido e o tamanho / data de modificação do csv. Se o csv apenas recebeu linhas novas no final, somente
+# esse trecho é lido, limpo e gravado como um novo trecho ordenado ( dataset/train.clean.1.parquet, .2... ),
+# sem reescrever o parquet principal. Cada trecho está ordenado por Order_Date: a leitura junta os trechos
+# com o merge do timsort ( sort estável sobre sequências já ordenadas ), ou apenas os concatena quando as
+# datas novas vêm depois das anteriores. Com MAXIMO_TRECHOS trechos o parquet é refeito em um só arquivo.
+#
+# Os trechos guardam o identificador do parquet principal que completam ( trechos de um parquet antigo são
+# ignorados ) e os metadados acumulados ( limpeza, leitura, última data ) até eles.
+
+# Caminho do csv usado pelas páginas; a variável de ambiente CURRY_DADOS troca o arquivo ( ex.: um csv
+# sintético gerado com "python -m curry.sintetico" para testes de carga )
+CAMINHO_DADOS = os.environ.get( 'CURRY_DADOS', 'dataset/train.csv' )
+
+MAXIMO_TRECHOS = 16
+
+_META_VERSAO = b'curry.versao_limpeza'
+_META_ATTRS = b'curry.attrs'
+_META_LEITURA = b'curry.leitura'
+_META_BASE = b'curry.base'
+_META_ULTIMA_DATA = b'curry.ultima_data'
+
+def caminho_colunar( caminho ):
+    """Retorna o caminho do arquivo parquet correspondente ao csv"""
+    return os.path.splitext( caminho )[0] + '.clean.parquet'
+
+def _caminho_trecho( caminho_pq, numero ):
+    """Caminho do n-ésimo trecho anexado ao parquet ( dataset/train.clean.parquet -> dataset/train.clean.1.parquet )"""
+    return '{}.{}.parquet'.format( os.path.splitext( caminho_pq )[0], numero )
+
+def _metadados( caminho_pq ):
+    """Metadados de um arquivo parquet ( vazio se o arquivo não existe ou está corrompido )"""
+    try:
+        return pq.read_schema( caminho_pq ).metadata or {}
+
+    except ( OSError, pa.ArrowException ):
+        return {}
+
+def _trechos( caminho_pq ):
+    """Retorna [ ( caminho, metadados ) ] do parquet principal e dos trechos anexados a ele, na ordem de gravação"""
+    metadados = _metadados( caminho_pq )
+    if not metadados:
+        return []
+
+    trechos = [ ( caminho_pq, metadados ) ]
+    while True:
+        caminho_trecho = _caminho_trecho( caminho_pq, len( trechos ) )
+        metadados_trecho = _metadados( caminho_trecho )
+
+        # Trechos de um parquet principal anterior ( refeito depois ) não fazem parte do dataset atual
+        if not metadados_trecho or metadados_trecho.get( _META_BASE ) != metadados.get( _META_BASE ):
+            return trechos
+
+        trechos.append( ( caminho_trecho, metadados_trecho ) )
+
+def _remover_trechos( caminho_pq ):
+    """Apaga os trechos anexados ao parquet ( de qualquer parquet principal )"""
+    numero = 1
+    while os.path.exists( _caminho_trecho( caminho_pq, numero ) ):
+        os.remove( _caminho_trecho( caminho_pq, numero ) )
+        numero += 1
+
+def _situacao_colunar( caminho, trechos ):
+    """Compara o parquet ( último trecho ) com o csv atual
+
+        Retorna ( situacao, leitura ): situacao é 'atualizado', 'anexar' ( o csv só cresceu ) ou 'refazer';
+        leitura é o registro gravado no parquet ( ver curry.leitura.registrar_leitura ).
+    """
+    if not trechos:
+        return 'refazer', None
+
+    # Parquet de uma versão anterior da limpeza ou do formato ( sem os metadados dos trechos ) é refeito
+    metadados = trechos[-1][1]
+    if metadados.get( _META_VERSAO ) != str( VERSAO_LIMPEZA ).encode() or \
+       any( chave not in metadados for chave in ( _META_LEITURA, _META_BASE, _META_ULTIMA_DATA ) ):
+        return 'refazer', None
+
+    leitura = json.loads( metadados[ _META_LEITURA ] )
+
+    return situacao_leitura( caminho, leitura ), leitura
+
+def _gravar_colunar( df, caminho_pq, leitura, base, ultima_data ):
+    """Grava o dataframe limpo ( ou um trecho ) em parquet de forma atômica ( arquivo temporário + rename )
+
+        Retorna False quando não foi possível gravar.
+    """
+    tabela = pa.Table.from_pandas( df )
+    metadados = dict( tabela.schema.metadata or {} )
+    metadados[ _META_VERSAO ] = str( VERSAO_LIMPEZA ).encode()
+    metadados[ _META_ATTRS ] = json.dumps( df.attrs ).encode()
+    metadados[ _META_LEITURA ] = json.dumps( leitura ).encode()
+    metadados[ _META_BASE ] = base.encode()
+    metadados[ _META_ULTIMA_DATA ] = ( '' if pd.isna( ultima_data ) else str( ultima_data ) ).encode()
+    tabela = tabela.replace_schema_metadata( metadados )
+
+    temporario = '{}.{}.tmp'.format( caminho_pq, os.getpid() )
+    try:
+        pq.write_table( tabela, temporario )
+        os.replace( temporario, caminho_pq )
+
+    except OSError:
+        # Diretório somente leitura, disco cheio...: segue sem o cache em disco
+        if os.path.exists( temporario ):
+            os.remove( temporario )
+        return False
+
+    return True
+
+def _juntar_ordenado( partes ):
+    """Junta partes ordenadas por Order_Date mantendo a ordem estável ( partes anteriores primeiro nos empates )"""
+    if len( partes ) == 1:
+        return partes[0]
+
+    df = pd.concat( partes )
+    if not df['Order_Date'].is_monotonic_increasing:
+        # O sort estável ( timsort ) encontra as sequências já ordenadas e apenas as intercala
+        df = df.sort_values( 'Order_Date', kind='stable' )
+
+    return df
+
+def _ler_colunar( caminho_pq, colunas, trechos=None ):
+    """Lê o parquet e os trechos anexados ( somente as colunas pedidas ) e restaura os metadados da limpeza"""
+    trechos = _trechos( caminho_pq ) if trechos is None else trechos
+
+    # A junção dos trechos precisa da data, mesmo fora das colunas pedidas
+    leitura = colunas
+    if colunas is not None and len( trechos ) > 1 and 'Order_Date' not in colunas:
+        leitura = list( colunas ) + [ 'Order_Date' ]
+
+    with etapa( 'leitura.parquet' ) as medicao:
+        df = _juntar_ordenado( [ pq.read_table( t, columns=leitura, use_pandas_metadata=True ).to_pandas() for t, _ in trechos ] )
+        df = medicao.saida( df if leitura is colunas else df.loc[ :, colunas ] )
+
+    df.attrs.update( json.loads( trechos[-1][1].get( _META_ATTRS, b'{}' ) ) )
+    if len( trechos ) > 1:
+        # memoria_categorias não é somável entre os trechos ( ver curry.limpeza.somar_attrs )
+        df.attrs['memoria_categorias'] = economia_categorias( df )
+
+    return df
+
+def _ler_tudo( caminho ):
+    """Lê e limpa o csv inteiro ( até a última linha completa )"""
+    info = os.stat( caminho )
+    fim = fim_ultima_linha( caminho )
+    df, linhas = limpar_intervalo( caminho, 0, fim )
+
+    return df, registrar_leitura( caminho, fim, linhas, info )
+
+def _refazer( caminho, caminho_pq ):
+    """Lê e limpa o csv inteiro e grava um novo parquet principal ( sem trechos )"""
+    df, leitura = _ler_tudo( caminho )
+
+    _gravar_colunar( df, caminho_pq, leitura, uuid.uuid4().hex, df['Order_Date'].max() )
+    _remover_trechos( caminho_pq )
+
+    return df
+
+def _anexar( caminho, caminho_pq, trechos, leitura ):
+    """Lê e limpa apenas as linhas novas do csv e as grava como um novo trecho ordenado do parquet
+
+        Retorna ( linhas novas limpas, gravado ). As linhas novas também ficam registradas para os objetos
+        derivados ( ver carregar_derivado ).
+    """
+    # O índice continua a numeração das linhas brutas do csv
+    info = os.stat( caminho )
+    fim = fim_ultima_linha( caminho )
+    delta, linhas_novas = limpar_intervalo( caminho, leitura['bytes_lidos'], fim, primeira_linha=leitura['linhas_lidas'] )
+    leitura_nova = registrar_leitura( caminho, fim, leitura['linhas_lidas'] + linhas_novas, info )
+
+    # As linhas novas vão para o fim do dataset quando nenhuma data é anterior à última já gravada
+    metadados = trechos[-1][1]
+    ultima_data = pd.Timestamp( metadados[ _META_ULTIMA_DATA ].decode() or None )
+    no_fim = pd.isna( ultima_data ) or len( delta ) == 0 or delta['Order_Date'].iloc[0] >= ultima_data
+
+    # O trecho guarda os contadores da limpeza acumulados ( memoria_categorias é recalculada na leitura )
+    delta.attrs = somar_attrs( json.loads( metadados.get( _META_ATTRS, b'{}' ) ), delta.attrs )
+    gravado = _gravar_colunar( delta, _caminho_trecho( caminho_pq, len( trechos ) ), leitura_nova, metadados[ _META_BASE ].decode(),
+                               pd.Series( [ ultima_data, delta['Order_Date'].max() ] ).max() )
+
+    versao_anterior = ( os.path.abspath( caminho ), leitura['mtime_ns'], leitura['tamanho'] )
+    versao_nova = ( os.path.abspath( caminho ), leitura_nova['mtime_ns'], leitura_nova['tamanho'] )
+    with _cache_lock:
+        _anexos[ os.path.abspath( caminho ) ] = ( versao_anterior, versao_nova, delta, no_fim )
+
+    return delta, gravado
+
+def _ler_e_limpar( caminho, colunas ):
+    """Lê o dataset limpo a partir do parquet, anexando / refazendo o parquet a partir do csv quando necessário"""
+    caminho_pq = caminho_colunar( caminho )
+    trechos = _trechos( caminho_pq )
+    situacao, leitura = _situacao_colunar( caminho, trechos )
+
+    if situacao == 'anexar':
+        delta, gravado = _anexar( caminho, caminho_pq, trechos, leitura )
+
+        if not gravado:
+            # Sem o trecho em disco ( diretório somente leitura... ): as linhas novas são juntadas em memória
+            df = _juntar_ordenado( [ _ler_colunar( caminho_pq, None, trechos ), delta ] )
+            df.attrs.update( delta.attrs, memoria_categorias=economia_categorias( df ) )
+            return _projetar( df, colunas )
+
+        trechos = _trechos( caminho_pq )
+        if len( trechos ) > MAXIMO_TRECHOS:
+            # Muitos trechos: o dataset inteiro volta para um único parquet principal
+            df = _ler_colunar( caminho_pq, None, trechos )
+            _gravar_colunar( df, caminho_pq, json.loads( trechos[-1][1][ _META_LEITURA ] ), uuid.uuid4().hex, df['Order_Date'].max() )
+            _remover_trechos( caminho_pq )
+            return _projetar( df, colunas )
+
+        situacao = 'atualizado'
+
+    if situacao == 'atualizado':
+        return _ler_colunar( caminho_pq, colunas, trechos )
+
+    return _projetar( _refazer( caminho, caminho_pq ), colunas )
+
+def _projetar( df, colunas ):
+    """Seleciona as colunas pedidas mantendo os metadados da limpeza"""
+    if colunas is None:
+        return df
+
+    attrs = dict( df.attrs )
+    df = df.loc[:, colunas]
+    df.attrs.update( attrs )
+
+    return df
+
+#==================================================================================================================================================================
+# Cache do dataset limpo ( compartilhado por todas as páginas do mesmo processo )
+#==================================================================================================================================================================
+
+_cache = {}
+_cache_lock = threading.RLock()
+
+# Atualização incremental dos objetos derivados ( ver carregar_derivado ):
+# _anexos: último anexo de cada csv, ( versão anterior, versão nova, linhas novas limpas, no_fim )
+# _anteriores: ( caminho, item ) -> ( versão, objeto ) descartado por uma versão nova do arquivo
+_anexos = {}
+_anteriores = {}
+_incrementais = set()
+
+logger = logging.getLogger( 'curry.ingestao' )
+
+def _relatar_carga( caminho, df ):
+    """Informa a memória economizada ( df.attrs['memoria_categorias'] ) pelas colunas categóricas carregadas
+
+        Vai para o logger "curry.ingestao" ( nível INFO ) e, com a instrumentação ligada, para o registro
+        "ingestao.memoria_categorias". Os valores são os do dataset limpo inteiro, por coluna.
+    """
+    economia = { c: v for c, v in df.attrs.get( 'memoria_categorias', {} ).items() if c in df.columns }
+
+    if economia:
+        economia_mb = { c: round( v / 2**20, 2 ) for c, v in economia.items() }
+        total_mb = round( sum( economia.values() ) / 2**20, 2 )
+
+        logger.info( 'Dataset %s carregado ( %d linhas ): memória economizada pelas categorias %s MB, total %.2f MB',
+                     caminho, len( df ), economia_mb, total_mb )
+        anotar( 'ingestao.memoria_categorias', economia_mb=economia_mb, total_mb=total_mb )
+
+    return df
+
+def chave_arquivo( caminho ):
+    """Monta a chave do cache a partir do caminho, data de modificação e tamanho do arquivo"""
+    caminho = os.path.abspath( caminho )
+    info = os.stat( caminho )
+
+    return ( caminho, info.st_mtime_ns, info.st_size )
+
+def _buscar_ou_construir( caminho, item, construir ):
+    """Devolve o item em cache para a versão atual do arquivo ou o constrói ( descartando versões antigas )"""
+    chave = chave_arquivo( caminho ) + ( item, )
+
+    with _cache_lock:
+        valor = _cache.get( chave )
+
+        if valor is None:
+            valor = construir()
+
+            # Só existe uma versão válida por arquivo: descarta os itens das versões antigas ( os derivados
+            # incrementais ficam guardados até serem atualizados com as linhas anexadas )
+            for chave_antiga in [ k for k in _cache if k[0] == chave[0] and k[1:3] != chave[1:3] ]:
+                if chave_antiga[3] in _incrementais:
+                    _anteriores[ ( chave_antiga[0], chave_antiga[3] ) ] = ( chave_antiga[:3], _cache[ chave_antiga ] )
+                del _cache[ chave_antiga ]
+
+            _cache[ chave ] = valor
+
+    return valor
+
+def carregar_dados( caminho=CAMINHO_DADOS, colunas=None ):
+    """Esta função lê e limpa o dataset uma única vez por processo
+
+        O dataframe limpo fica em cache com a chave ( caminho, mtime, tamanho ) do arquivo de origem.
+        Nas próximas execuções da página ( reruns do Streamlit ) o mesmo dataframe é devolvido sem
+        reler o csv. Se o arquivo for alterado a chave muda e os dados são lidos novamente.
+
+        Com "colunas" apenas essas colunas são lidas do cache parquet em disco ( ver caminho_colunar ).
+        A cada leitura a memória economizada pelas colunas categóricas é informada ( ver _relatar_carga ).
+
+        O dataframe devolvido é compartilhado: as páginas devem filtrar ( gerando um novo dataframe )
+        e nunca alterar o objeto recebido.
+
+    """
+    colunas = None if colunas is None else list( colunas )
+    item = ( 'dados', None if colunas is None else tuple( colunas ) )
+
+    return _buscar_ou_construir( caminho, item, lambda: _relatar_carga( caminho, _ler_e_limpar( caminho, colunas ) ) )
+
+def _anterior( chave ):
+    """Retira do cache e retorna ( versão, objeto ) do mesmo item em uma versão anterior do arquivo, ou None"""
+    for k in [ k for k in _cache if k[0] == chave[0] and k[3] == chave[3] and k[1:3] != chave[1:3] ]:
+        return k[:3], _cache.pop( k )
+
+    return _anteriores.pop( ( chave[0], chave[3] ), None )
+
+def carregar_derivado( caminho, nome, construir, anexar=None ):
+    """Esta função guarda no mesmo cache um objeto derivado do dataset ( agregados, índices... )
+
+        "construir" é chamada sem argumentos uma única vez por versão do arquivo de origem; o resultado
+        é invalidado junto com o dataset ( arquivo alterado ou limpar_cache ).
+
+        Com "anexar", quando a nova versão do csv apenas recebeu linhas no final, o objeto da versão anterior
+        é atualizado com anexar( anterior, linhas_novas, no_fim ) em vez de construído de novo. "linhas_novas"
+        são as linhas novas já limpas ( todas as colunas, ordenadas por Order_Date ) e "no_fim" diz se elas
+        ficam no fim do dataset ordenado ( posições len( anterior ) em diante ). anexar pode devolver None
+        para construir do zero.
+    """
+    item = ( 'derivado', nome )
+    if anexar is None:
+        return _buscar_ou_construir( caminho, item, construir )
+
+    _incrementais.add( item )
+
+    def construir_ou_anexar():
+        anterior = _anterior( chave_arquivo( caminho ) + ( item, ) )
+
+        if anterior is not None:
+            # Garante o parquet ( e o registro das linhas anexadas ) na versão atual do csv
+            carregar_dados( caminho, colunas=[ 'Order_Date' ] )
+            versao_anterior, versao_nova, linhas_novas, no_fim = _anexos.get( os.path.abspath( caminho ), ( None, None, None, None ) )
+
+            if versao_anterior == anterior[0] and versao_nova == chave_arquivo( caminho ):
+                valor = anexar( anterior[1], linhas_novas, no_fim )
+                if valor is not None:
+                    return valor
+
+        return construir()
+
+    return _buscar_ou_construir( caminho, item, construir_ou_anexar )
+
+def limpar_cache( caminho=None, apagar_colunar=False ):
+    """Invalida o cache do dataset limpo ( e dos objetos derivados dele )
+
+        Sem argumentos descarta todos os arquivos em cache, com o caminho descarta apenas aquele arquivo.
+        Com apagar_colunar=True o parquet em disco também é apagado e será refeito a partir do csv.
+    """
+    with _cache_lock:
+        caminhos = { k[0] for k in _cache } if caminho is None else { os.path.abspath( caminho ) }
+
+        for chave in [ k for k in _cache if k[0] in caminhos ]:
+            del _cache[ chave ]
+
+        for chave in [ k for k in _anteriores if k[0] in caminhos ]:
+            del _anteriores[ chave ]
+
+        for c in caminhos:
+            _anexos.pop( c, None )
+
+        if apagar_colunar:
+            for c in caminhos:
+                caminho_pq = caminho_colunar( c )
+                _remover_trechos( caminho_pq )
+                if os.path.exists( caminho_pq ):
+                    os.remove( caminho_pq )
@@ -0,0 +1,266 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import os
+
+import numpy as np
+import pandas as pd
+
+from curry.cache_resultados import normalizar_filtro
+from curry.cubo import CHAVES_ENTREGADORES, combinar_contagens, contagens_com_esbocos, cubo_de_agregados
+from curry.ingestao import CAMINHO_DADOS, carregar_derivado, chave_arquivo
+from curry.leitura import cabecalho, fim_ultima_linha, ler_csv_intervalo_em_blocos, registrar_leitura, situacao_leitura
+from curry.limpeza import clean_code
+
+#==================================================================================================================================================================
+# Ingestão em blocos ( streaming ) para datasets maiores que a memória
+#==================================================================================================================================================================
+#
+# O csv é lido em blocos de "tamanho_bloco" linhas; cada bloco é limpo com o clean_code e dobrado nos
+# agregados usados pelas páginas. Nenhum bloco é guardado: o pico de memória depende do tamanho do bloco
+# e da quantidade de chaves distintas dos agregados ( dias x tráfegos x cidades x entregadores... ), não
+# do tamanho do arquivo.
+#
+# Todo agregado é guardado também por ( Order_Date, Road_traffic_density ), assim os filtros da barra
+# lateral continuam funcionando sobre os resultados.
+#
+# Média e desvio padrão são guardados como ( n, média, M2 = soma dos quadrados dos desvios ) e combinados
+# com a fórmula de Chan et al., que é exata ( sem a perda de precisão de soma_q - soma²/n ). Por isso os
+# agregados podem receber blocos novos a qualquer momento ( atualizar_agregados, ingestão incremental ).
+#
+# Modo streaming das páginas ( variável de ambiente CURRY_STREAMING=1 ): as páginas não carregam o dataset
+# limpo. O cubo de pedidos e as métricas vêm dos agregados ( carregar_agregados ), fatiados pelos filtros da
+# barra lateral ( AgregadosStreaming.fatiar ); as métricas com versão para os agregados estão em
+# curry.metricas ( por_agregados ). Mapas e busca geográfica precisam das entregas linha a linha e ficam
+# indisponíveis nesse modo.
+
+TAMANHO_BLOCO_PADRAO = 100_000
+
+MODO_STREAMING = os.environ.get( 'CURRY_STREAMING', '' ) not in ( '', '0' )
+
+DIMENSOES_FILTRO = [ 'Order_Date', 'Road_traffic_density' ]
+
+# Momentos acumulados: nome -> ( dimensões de agrupamento, coluna numérica )
+# Para cada chave são guardados contagem, média, M2, mínimo e máximo.
+MOMENTOS_PADRAO = {
+    'idade': ( [], 'Delivery_person_Age' ),
+    'condicao_veiculo': ( [], 'Vehicle_condition' ),
+    'distancia': ( [], 'Distance_km' ),
+    'distancia_cidade': ( [ 'City' ], 'Distance_km' ),
+    'avaliacao_entregador': ( [ 'Delivery_person_ID' ], 'Delivery_person_Ratings' ),
+    'avaliacao_transito': ( [ 'Road_traffic_density' ], 'Delivery_person_Ratings' ),
+    'avaliacao_clima': ( [ 'Weatherconditions' ], 'Delivery_person_Ratings' ),
+    'tempo_entregador_cidade': ( [ 'City', 'Delivery_person_ID' ], 'Time_taken(min)' ),
+    'tempo_festival': ( [ 'Festival' ], 'Time_taken(min)' ),
+    'tempo_cidade': ( [ 'City' ], 'Time_taken(min)' ),
+    'tempo_cidade_trafego': ( [ 'City', 'Road_traffic_density' ], 'Time_taken(min)' ),
+    'tempo_cidade_pedido': ( [ 'City', 'Type_of_order' ], 'Time_taken(min)' ),
+}
+
+def _chaves( dimensoes ):
+    """Dimensões de agrupamento + dimensões dos filtros, sem repetição"""
+    return DIMENSOES_FILTRO + [ d for d in dimensoes if d not in DIMENSOES_FILTRO ]
+
+def _momentos_bloco( df, dimensoes, coluna ):
+    """Calcula contagem, média, M2, mínimo e máximo de "coluna" por chave em um bloco"""
+    chaves = _chaves( dimensoes )
+    grupos = df[coluna].astype( np.float64 ).groupby( [ df[c] for c in chaves ], observed=True )
+
+    parcial = grupos.agg( [ 'count', 'mean', 'min', 'max' ] )
+    parcial.columns = [ 'n', 'media', 'minimo', 'maximo' ]
+    parcial['m2'] = grupos.var( ddof=0 ) * parcial['n']
+
+    return parcial.loc[ parcial['n'] > 0, : ].reset_index()
+
+def combinar_momentos( df, chaves ):
+    """Combina linhas de momentos ( n, media, m2, minimo, maximo ) com as mesmas chaves ( fórmula de Chan )
+
+        n = soma( n_i ); média = soma( n_i * média_i ) / n; M2 = soma( M2_i + n_i * ( média_i - média )² )
+    """
+    if not chaves:
+        df = df.assign( _todos=0 )
+        return combinar_momentos( df, [ '_todos' ] ).drop( columns='_todos' )
+
+    df = df.assign( _soma=df['n'] * df['media'] )
+    grupos = df.groupby( chaves, observed=True )
+    media = grupos['_soma'].transform( 'sum' ) / grupos['n'].transform( 'sum' )
+    df['_m2'] = df['m2'] + df['n'] * ( df['media'] - media ) ** 2
+
+    resultado = df.groupby( chaves, observed=True ).agg( n=( 'n', 'sum' ), _soma=( '_soma', 'sum' ), m2=( '_m2', 'sum' ),
+                                                          minimo=( 'minimo', 'min' ), maximo=( 'maximo', 'max' ) )
+    resultado['media'] = resultado['_soma'] / resultado['n']
+
+    return resultado.reset_index().loc[ :, chaves + [ 'n', 'media', 'm2', 'minimo', 'maximo' ] ]
+
+def _dobrar( acumulado, parcial, combinar ):
+    """Junta o resultado parcial de um bloco ao acumulado"""
+    if acumulado is None:
+        return parcial
+
+    return combinar( pd.concat( [ acumulado, parcial ], ignore_index=True ) )
+
+class AgregadosStreaming:
+    """Agregados do dataset limpo construídos bloco a bloco
+
+        contagens: Qtde_Pedidos por ( Order_Date, City, Road_traffic_density )
+        esbocos: esboço HyperLogLog dos entregadores de cada linha de "contagens" ( curry.hll )
+        entregadores: pares distintos ( Order_Date, Road_traffic_density, Delivery_person_ID )
+        momentos: contagem, média, M2, mínimo e máximo ( ver MOMENTOS_PADRAO )
+        leitura: até onde o csv já foi lido ( curry.leitura.registrar_leitura ), ver atualizar_agregados
+        attrs: 'versao' do dataset de origem ( chave do arquivo ), usada no estado de filtro das fatias
+    """
+
+    def __init__( self, momentos=MOMENTOS_PADRAO ):
+        self.definicoes = dict( momentos )
+        self.acumulados = { nome: None for nome in self.definicoes }
+        self.contagens = None
+        self.esbocos = None
+        self.entregadores = None
+        self.linhas = 0
+        self.descartados = {}
+        self.rejeitados = {}
+        self.leitura = None
+        self.attrs = {}
+
+    def adicionar( self, df ):
+        """Dobra um bloco já limpo ( saída do clean_code ) nos agregados"""
+        self.linhas += len( df )
+
+        for origem, destino in [ ( df.attrs.get( 'descartados', {} ), self.descartados ), ( df.attrs.get( 'rejeitados', {} ), self.rejeitados ) ]:
+            for regra, quantidade in origem.items():
+                destino[regra] = destino.get( regra, 0 ) + quantidade
+
+        contagens, esbocos = contagens_com_esbocos( df )
+        if self.contagens is not None:
+            contagens, esbocos = combinar_contagens( pd.concat( [ self.contagens, contagens ], ignore_index=True ),
+                                                     np.concatenate( [ self.esbocos, esbocos ] ) )
+        self.contagens, self.esbocos = contagens, esbocos
+
+        pares = df.loc[ :, CHAVES_ENTREGADORES ].drop_duplicates()
+        if self.entregadores is not None:
+            pares = pd.concat( [ self.entregadores, pares ], ignore_index=True ).drop_duplicates()
+        self.entregadores = pares.reset_index( drop=True )
+
+        for nome, ( dimensoes, coluna ) in self.definicoes.items():
+            chaves = _chaves( dimensoes )
+            self.acumulados[nome] = _dobrar( self.acumulados[nome], _momentos_bloco( df, dimensoes, coluna ),
+                                             lambda d: combinar_momentos( d, chaves ) )
+
+    def momentos( self, nome, data_limite=None, trafegos=None ):
+        """Retorna contagem, média, desvio padrão ( amostral ), mínimo e máximo por dimensão, com os filtros da barra lateral"""
+        dimensoes, coluna = self.definicoes[nome]
+        colunas = dimensoes + [ 'n', 'media', 'desvio_padrao', 'minimo', 'maximo' ]
+        df = self.acumulados[nome]
+
+        if df is None:
+            return pd.DataFrame( columns=colunas )
+
+        df = combinar_momentos( self._filtrar( df, data_limite, trafegos ), dimensoes )
+        df = df.sort_values( dimensoes, kind='stable' ).reset_index( drop=True ) if dimensoes else df
+        df['desvio_padrao'] = np.sqrt( ( df['m2'] / ( df['n'] - 1 ) ).where( df['n'] > 1 ) )
+
+        return df.loc[ :, colunas ]
+
+    def cubo( self ):
+        """Monta o cubo de pedidos da Visão Empresa ( curry.cubo ) a partir dos agregados"""
+        cubo = cubo_de_agregados( self.contagens, self.entregadores, self.esbocos )
+        cubo.attrs.update( self.attrs )
+
+        return cubo
+
+    def fatiar( self, data_limite=None, trafegos=None ):
+        """Guarda os filtros da barra lateral para as métricas lidas dos agregados ( ver FatiaAgregados )"""
+        return FatiaAgregados( self, data_limite, trafegos )
+
+    @staticmethod
+    def _filtrar( df, data_limite, trafegos ):
+        """Aplica os filtros de data e tráfego sobre um agregado com as colunas de DIMENSOES_FILTRO"""
+        if data_limite is not None:
+            df = df.loc[ df['Order_Date'] < data_limite, : ]
+
+        if trafegos is not None:
+            df = df.loc[ df['Road_traffic_density'].isin( trafegos ), : ]
+
+        return df
+
+class FatiaAgregados:
+    """Agregados com os filtros da barra lateral ( Order_Date < data_limite e tráfego em "trafegos" )
+
+        Entrada das métricas no modo streaming, no lugar do dataframe filtrado: os filtros são aplicados
+        na leitura dos momentos ( None = sem filtro ). Com a versão do dataset de origem ( carregar_agregados )
+        attrs['estado_filtro'] permite memorizar os resultados ( curry.cache_resultados ).
+    """
+
+    def __init__( self, agregados, data_limite=None, trafegos=None ):
+        self.agregados = agregados
+        self.data_limite = data_limite
+        self.trafegos = None if trafegos is None else list( trafegos )
+        self.attrs = {}
+
+        if agregados.attrs.get( 'versao' ) is not None and data_limite is not None and trafegos is not None:
+            self.attrs['estado_filtro'] = normalizar_filtro( agregados.attrs['versao'], data_limite, trafegos )
+
+    def momentos( self, nome ):
+        """Momentos "nome" ( ver AgregadosStreaming.momentos ) dentro dos filtros"""
+        return self.agregados.momentos( nome, self.data_limite, self.trafegos )
+
+    def dimensoes( self, nome ):
+        """Dimensões de agrupamento dos momentos "nome" """
+        return list( self.agregados.definicoes[nome][0] )
+
+def atualizar_agregados( agregados, caminho=CAMINHO_DADOS, tamanho_bloco=TAMANHO_BLOCO_PADRAO ):
+    """Esta função lê ( em blocos ) apenas as linhas do csv ainda não dobradas nos agregados
+
+        Se o csv foi reescrito ou encolheu ( ver curry.leitura.situacao_leitura ), os agregados são refeitos
+        do zero. Retorna os agregados atualizados ( o mesmo objeto, ou um novo quando refeitos ).
+    """
+    info = os.stat( caminho )
+    fim = fim_ultima_linha( caminho )
+    leitura = agregados.leitura
+
+    if leitura is not None and situacao_leitura( caminho, leitura, fim, info ) == 'refazer':
+        agregados = AgregadosStreaming( agregados.definicoes )
+        leitura = None
+
+    inicio, linhas = ( 0, 0 ) if leitura is None else ( leitura['bytes_lidos'], leitura['linhas_lidas'] )
+
+    if fim > inicio:
+        colunas = cabecalho( caminho ) if inicio > 0 else None
+
+        for bloco in ler_csv_intervalo_em_blocos( caminho, inicio, fim, colunas, tamanho_bloco ):
+            linhas += len( bloco )
+            agregados.adicionar( clean_code( bloco ) )
+
+    agregados.leitura = registrar_leitura( caminho, fim, linhas, info )
+
+    return agregados
+
+def agregar_csv_em_blocos( caminho=CAMINHO_DADOS, tamanho_bloco=TAMANHO_BLOCO_PADRAO, momentos=MOMENTOS_PADRAO ):
+    """Esta função lê o csv em blocos, limpa cada bloco e devolve os agregados ( AgregadosStreaming )
+
+        Apenas um bloco bruto e um bloco limpo existem na memória de cada vez.
+    """
+    return atualizar_agregados( AgregadosStreaming( momentos ), caminho, tamanho_bloco )
+
+# Agregados mais recentes de cada csv: uma nova versão do arquivo só dobra as linhas anexadas
+_agregados = {}
+
+def carregar_agregados( caminho=CAMINHO_DADOS ):
+    """Esta função devolve os agregados streaming do csv, atualizados uma única vez por versão do arquivo
+
+        A primeira chamada lê o csv inteiro em blocos; nas versões seguintes do arquivo apenas as linhas
+        anexadas são lidas ( atualizar_agregados ).
+    """
+    def construir():
+        chave = os.path.abspath( caminho )
+        agregados = atualizar_agregados( _agregados.get( chave ) or AgregadosStreaming(), caminho )
+        agregados.attrs['versao'] = chave_arquivo( caminho )
+        _agregados[chave] = agregados
+
+        return agregados
+
+    return carregar_derivado( caminho, 'agregados_streaming', construir )
+
+def carregar_cubo_agregados( caminho=CAMINHO_DADOS ):
+    """Cubo de pedidos montado a partir dos agregados streaming ( modo streaming das páginas )"""
+    return carregar_derivado( caminho, 'cubo_agregados', lambda: carregar_agregados( caminho ).cubo() )
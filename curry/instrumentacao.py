@@ -0,0 +1,204 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+import pandas as pd
+import psutil
+
+#==================================================================================================================================================================
+# Instrumentação das etapas ( tempo, linhas e memória )
+#==================================================================================================================================================================
+#
+# Ligada com a variável de ambiente CURRY_INSTRUMENTACAO=1. Cada etapa medida ( leitura do csv/parquet,
+# passos do clean_code, filtros da barra lateral, funções dos gráficos e renderização ) gera um registro
+# com duração, linhas de entrada/saída e variação do RSS do processo. Os registros:
+#   - são gravados como uma linha JSON por etapa no logger "curry.instrumentacao" ( stderr, ou no arquivo
+#     de CURRY_INSTRUMENTACAO_LOG );
+#   - ficam guardados por execução da página e aparecem no painel de depuração da barra lateral.
+#
+# anotar() grava um registro sem medição, com valores informados por quem chama ( ex.: a memória economizada
+# pelas colunas categóricas quando o dataset é carregado ), na coluna "detalhes".
+#
+# Desligada, etapa() e cronometro() devolvem objetos que não fazem nada e instrumentar() devolve a própria
+# função, sem nenhum custo nas chamadas.
+
+ATIVO = os.environ.get( 'CURRY_INSTRUMENTACAO', '' ) not in ( '', '0' )
+
+logger = logging.getLogger( 'curry.instrumentacao' )
+
+_local = threading.local()
+_processo = psutil.Process() if ATIVO else None
+
+if ATIVO and not logger.handlers:
+    _destino = os.environ.get( 'CURRY_INSTRUMENTACAO_LOG' )
+    _handler = logging.FileHandler( _destino ) if _destino else logging.StreamHandler( sys.stderr )
+    _handler.setFormatter( logging.Formatter( '%(message)s' ) )
+    logger.addHandler( _handler )
+    logger.setLevel( logging.INFO )
+    logger.propagate = False
+
+def _rss():
+    return _processo.memory_info().rss
+
+def _linhas( objeto ):
+    """Quantidade de linhas de um dataframe/série ( ou das contagens de um cubo ); None para outros objetos"""
+    if isinstance( objeto, ( pd.DataFrame, pd.Series ) ):
+        return len( objeto )
+
+    contagens = getattr( objeto, 'contagens', None )
+    return len( contagens ) if isinstance( contagens, pd.DataFrame ) else None
+
+def iniciar_execucao( pagina ):
+    """Começa uma nova lista de registros para a execução atual da página ( chamar no início do script )"""
+    if not ATIVO:
+        return
+
+    _local.execucao = uuid.uuid4().hex[ :12 ]
+    _local.pagina = pagina
+    _local.registros = []
+
+def registros():
+    """Registros da execução atual da página ( lista vazia se a instrumentação estiver desligada )"""
+    return list( getattr( _local, 'registros', [] ) )
+
+def _registrar( nome, segundos, linhas_entrada, linhas_saida, rss_antes, rss_depois ):
+    registro = { 'momento': time.strftime( '%Y-%m-%dT%H:%M:%S' ),
+                 'execucao': getattr( _local, 'execucao', None ),
+                 'pagina': getattr( _local, 'pagina', None ),
+                 'etapa': nome,
+                 'segundos': round( segundos, 6 ),
+                 'linhas_entrada': linhas_entrada,
+                 'linhas_saida': linhas_saida,
+                 'memoria_delta_mb': round( ( rss_depois - rss_antes ) / 2**20, 3 ),
+                 'rss_mb': round( rss_depois / 2**20, 1 ) }
+
+    lista = getattr( _local, 'registros', None )
+    if lista is not None:
+        lista.append( registro )
+
+    logger.info( json.dumps( registro, ensure_ascii=False ) )
+
+def anotar( nome, **detalhes ):
+    """Registra a etapa "nome" sem medição, apenas com os "detalhes" informados ( nada com a instrumentação desligada )"""
+    if not ATIVO:
+        return
+
+    registro = { 'momento': time.strftime( '%Y-%m-%dT%H:%M:%S' ),
+                 'execucao': getattr( _local, 'execucao', None ),
+                 'pagina': getattr( _local, 'pagina', None ),
+                 'etapa': nome,
+                 'detalhes': detalhes }
+
+    lista = getattr( _local, 'registros', None )
+    if lista is not None:
+        lista.append( registro )
+
+    logger.info( json.dumps( registro, ensure_ascii=False ) )
+
+class _Etapa:
+    """Mede o bloco "with"; saida( objeto ) informa o resultado para contar as linhas de saída"""
+
+    def __init__( self, nome, entrada=None ):
+        self.nome = nome
+        self.linhas_entrada = _linhas( entrada )
+        self.linhas_saida = None
+
+    def saida( self, objeto ):
+        self.linhas_saida = _linhas( objeto )
+        return objeto
+
+    def __enter__( self ):
+        self._rss = _rss()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__( self, *_ ):
+        _registrar( self.nome, time.perf_counter() - self._inicio, self.linhas_entrada, self.linhas_saida, self._rss, _rss() )
+
+class _Cronometro:
+    """Mede passos consecutivos: cada marcar() registra o tempo desde a marca anterior"""
+
+    def __init__( self, prefixo, entrada=None ):
+        self.prefixo = prefixo
+        self._linhas = _linhas( entrada )
+        self._rss = _rss()
+        self._inicio = time.perf_counter()
+
+    def marcar( self, nome, saida=None ):
+        agora, rss, linhas = time.perf_counter(), _rss(), _linhas( saida )
+        _registrar( self.prefixo + '.' + nome, agora - self._inicio, self._linhas, linhas, self._rss, rss )
+        self._linhas, self._rss, self._inicio = linhas, rss, time.perf_counter()
+
+class _Inativo:
+    """Substituto de _Etapa e _Cronometro com a instrumentação desligada"""
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *_ ):
+        pass
+
+    def saida( self, objeto ):
+        return objeto
+
+    def marcar( self, nome, saida=None ):
+        pass
+
+_INATIVO = _Inativo()
+
+def etapa( nome, entrada=None ):
+    """Context manager que mede o bloco como a etapa "nome" ( "entrada" só é usada para contar linhas )"""
+    return _Etapa( nome, entrada ) if ATIVO else _INATIVO
+
+def cronometro( prefixo, entrada=None ):
+    """Cronômetro de passos consecutivos ( ex.: passos numerados do clean_code )"""
+    return _Cronometro( prefixo, entrada ) if ATIVO else _INATIVO
+
+def instrumentar( funcao=None, nome=None ):
+    """Decorador: mede cada chamada da função como a etapa "nome" ( padrão: nome da função )
+
+        Uso: @instrumentar, @instrumentar( nome='filtro.indice' ) ou instrumentar( st.plotly_chart, 'render.plotly_chart' ).
+        As linhas de entrada são as do primeiro argumento com linhas ( dataframe ou cubo ).
+    """
+    if funcao is None:
+        return lambda f: instrumentar( f, nome )
+
+    if not ATIVO:
+        return funcao
+
+    nome = nome or funcao.__name__
+
+    @functools.wraps( funcao )
+    def funcao_instrumentada( *args, **kwargs ):
+        entrada = next( ( a for a in args if _linhas( a ) is not None ), None )
+        with _Etapa( nome, entrada ) as medicao:
+            return medicao.saida( funcao( *args, **kwargs ) )
+
+    return funcao_instrumentada
+
+def painel_depuracao():
+    """Mostra os registros da execução atual em um painel na barra lateral ( só com a instrumentação ligada )"""
+    if not ATIVO:
+        return
+
+    import streamlit as st
+
+    tabela = pd.DataFrame( registros() )
+
+    with st.sidebar.expander( 'Depuração: tempo por etapa' ):
+        if tabela.empty:
+            st.write( 'Nenhuma etapa medida nesta execução.' )
+            return
+
+        tabela = tabela.reindex( columns=[ 'etapa', 'segundos', 'linhas_entrada', 'linhas_saida', 'memoria_delta_mb', 'detalhes' ] )
+        st.write( 'Total medido: {:.3f} s'.format( tabela['segundos'].sum() ) )
+        tabela['detalhes'] = tabela['detalhes'].map( lambda d: json.dumps( d, ensure_ascii=False ) if isinstance( d, dict ) else '' )
+        st.dataframe( tabela )
@@ -0,0 +1,23 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import streamlit as st
+
+#==================================================================================================================================================================
+# Abas com renderização preguiçosa
+#==================================================================================================================================================================
+#
+# O st.tabs executa o conteúdo de todas as abas a cada rerun, mesmo as que o usuário não abriu. Aqui a aba
+# é um st.radio horizontal: a página só monta os gráficos da aba selecionada. A seleção fica no
+# st.session_state ( "chave" ) e os resultados continuam no cache de curry.cache_resultados, então voltar
+# para uma aba já aberta com os mesmos filtros não recalcula nada.
+
+def abas_preguicosas( nomes, chave ):
+    """Desenha o seletor de abas e retorna o nome da aba selecionada
+
+        Uso:
+            vAba = abas_preguicosas( [ 'Visão Gerencial', 'Visão Tática' ], chave='abas_empresas' )
+            if vAba == 'Visão Gerencial':
+                ...
+    """
+    return st.radio( 'Abas', nomes, horizontal=True, key=chave, label_visibility='collapsed' )
@@ -0,0 +1,152 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+from curry.instrumentacao import etapa
+
+#==================================================================================================================================================================
+# Leitura do csv por intervalos de bytes
+#==================================================================================================================================================================
+#
+# Usado pela ingestão incremental: o cache guarda até qual byte do csv já foi lido ( sempre o fim de uma
+# linha completa ), uma assinatura do começo do arquivo, uma assinatura da janela que termina no último
+# byte lido e o tamanho / data de modificação do csv. Se o arquivo só cresceu, apenas o trecho novo é lido
+# e limpo ( ver situacao_leitura ).
+
+TAMANHO_ASSINATURA = 64 * 1024
+
+class LeitorLimitado( io.RawIOBase ):
+    """Arquivo somente leitura que expõe apenas os bytes [ inicio, fim ) de outro arquivo"""
+
+    def __init__( self, arquivo, inicio, fim ):
+        self._arquivo = arquivo
+        self._arquivo.seek( inicio )
+        self._restante = fim - inicio
+
+    def readable( self ):
+        return True
+
+    def readinto( self, buffer ):
+        n = min( len( buffer ), self._restante )
+        if n <= 0:
+            return 0
+
+        dados = self._arquivo.read( n )
+        buffer[ :len( dados ) ] = dados
+        self._restante -= len( dados )
+
+        return len( dados )
+
+def fim_ultima_linha( caminho, tamanho=None ):
+    """Retorna a posição logo após a última quebra de linha dentro dos primeiros "tamanho" bytes do arquivo"""
+    tamanho = os.path.getsize( caminho ) if tamanho is None else tamanho
+    bloco = 64 * 1024
+
+    with open( caminho, 'rb' ) as arquivo:
+        fim = tamanho
+        while fim > 0:
+            inicio = max( 0, fim - bloco )
+            arquivo.seek( inicio )
+            posicao = arquivo.read( fim - inicio ).rfind( b'\n' )
+
+            if posicao >= 0:
+                return inicio + posicao + 1
+
+            fim = inicio
+
+    return 0
+
+def assinatura( caminho, tamanho ):
+    """Hash dos primeiros min( tamanho, TAMANHO_ASSINATURA ) bytes do arquivo: muda se o começo do arquivo foi reescrito"""
+    with open( caminho, 'rb' ) as arquivo:
+        return hashlib.sha1( arquivo.read( min( tamanho, TAMANHO_ASSINATURA ) ) ).hexdigest()
+
+def assinatura_cauda( caminho, fim ):
+    """Hash dos TAMANHO_ASSINATURA bytes que terminam em "fim": muda se o trecho já lido foi reescrito perto do fim"""
+    inicio = max( 0, fim - TAMANHO_ASSINATURA )
+
+    with open( caminho, 'rb' ) as arquivo:
+        arquivo.seek( inicio )
+        return hashlib.sha1( arquivo.read( fim - inicio ) ).hexdigest()
+
+def registrar_leitura( caminho, fim, linhas, info ):
+    """Monta o registro de leitura do cache: csv lido até o byte "fim" ( "linhas" linhas brutas )
+
+        "info" é o os.stat do csv tomado antes da leitura: linhas anexadas durante a leitura mudam o tamanho
+        e são lidas na próxima atualização.
+    """
+    return { 'bytes_lidos': fim, 'linhas_lidas': linhas,
+             'bytes_assinatura': min( fim, TAMANHO_ASSINATURA ), 'assinatura': assinatura( caminho, fim ),
+             'assinatura_cauda': assinatura_cauda( caminho, fim ),
+             'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns }
+
+def situacao_leitura( caminho, leitura, fim=None, info=None ):
+    """Compara o registro de leitura do cache com o csv atual: 'atualizado', 'anexar' ( o csv só cresceu ) ou 'refazer'
+
+        O cache é refeito quando:
+        - o registro é de uma versão antiga ( sem as assinaturas / tamanho / data de modificação );
+        - o csv encolheu, ou tem o mesmo tamanho e outra data de modificação ( reescrito no lugar );
+        - o começo do arquivo ou a janela que termina no último byte lido mudou;
+        - o último byte lido não é mais uma quebra de linha ( a leitura incremental começaria no meio de uma linha ).
+
+        Uma alteração fora das duas janelas assinadas acompanhada de linhas novas não é detectada.
+    """
+    info = os.stat( caminho ) if info is None else info
+    fim = fim_ultima_linha( caminho ) if fim is None else fim
+
+    if any( chave not in leitura for chave in ( 'assinatura_cauda', 'tamanho', 'mtime_ns' ) ):
+        return 'refazer'
+
+    lidos = leitura['bytes_lidos']
+
+    if info.st_size < leitura['tamanho'] or ( info.st_size == leitura['tamanho'] and info.st_mtime_ns != leitura['mtime_ns'] ):
+        return 'refazer'
+
+    if fim < lidos or assinatura( caminho, leitura['bytes_assinatura'] ) != leitura['assinatura'] \
+       or assinatura_cauda( caminho, lidos ) != leitura['assinatura_cauda']:
+        return 'refazer'
+
+    if lidos > 0:
+        with open( caminho, 'rb' ) as arquivo:
+            arquivo.seek( lidos - 1 )
+            if arquivo.read( 1 ) != b'\n':
+                return 'refazer'
+
+    return 'atualizado' if fim == lidos else 'anexar'
+
+def cabecalho( caminho ):
+    """Nomes das colunas ( primeira linha ) do csv"""
+    with open( caminho, 'rb' ) as arquivo:
+        return pd.read_csv( io.BytesIO( arquivo.readline() ) ).columns.tolist()
+
+def ler_csv_intervalo( caminho, inicio, fim, colunas=None, **kwargs ):
+    """Esta função lê as linhas do csv contidas nos bytes [ inicio, fim )
+
+        Com inicio=0 a primeira linha é o cabeçalho; nos demais casos "colunas" ( ver cabecalho ) dá os nomes.
+        "inicio" e "fim" devem estar em começos de linha ( ver fim_ultima_linha ).
+    """
+    with open( caminho, 'rb' ) as arquivo, etapa( 'leitura.csv' ) as medicao:
+        leitor = io.BufferedReader( LeitorLimitado( arquivo, inicio, fim ) )
+
+        if inicio == 0:
+            return medicao.saida( pd.read_csv( leitor, **kwargs ) )
+
+        return medicao.saida( pd.read_csv( leitor, header=None, names=colunas, **kwargs ) )
+
+def ler_csv_intervalo_em_blocos( caminho, inicio, fim, colunas=None, tamanho_bloco=100_000, **kwargs ):
+    """Igual a ler_csv_intervalo, mas devolve os dataframes em blocos de "tamanho_bloco" linhas ( gerador )"""
+    with open( caminho, 'rb' ) as arquivo:
+        leitor = io.BufferedReader( LeitorLimitado( arquivo, inicio, fim ) )
+
+        if inicio == 0:
+            blocos = pd.read_csv( leitor, chunksize=tamanho_bloco, **kwargs )
+        else:
+            blocos = pd.read_csv( leitor, header=None, names=colunas, chunksize=tamanho_bloco, **kwargs )
+
+        with blocos:
+            yield from blocos
@@ -0,0 +1,176 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import sys
+
+import numpy as np
+import pandas as pd
+
+from curry.conversao import calendario_iso, converter_clima, converter_tempo_entrega
+from curry.distancia import haversine_vetorizado
+from curry.instrumentacao import cronometro
+
+#==================================================================================================================================================================
+# Limpeza dos dados do dataset
+#==================================================================================================================================================================
+
+# Versão do resultado da limpeza: incrementar sempre que as colunas ou tipos gerados mudarem,
+# assim o cache parquet em disco ( curry.ingestao ) é refeito automaticamente
+VERSAO_LIMPEZA = 5
+
+# Regras de descarte das linhas com valores sentinela no csv original: ( nome da regra, coluna, valor )
+# Todas as regras são avaliadas sobre o dataframe lido e combinadas em uma única máscara.
+REGRAS_SENTINELA = [
+    ( 'idade_vazia', 'Delivery_person_Age', 'NaN ' ),
+    ( 'clima_vazio', 'Weatherconditions', 'conditions NaN' ),
+    ( 'entregas_multiplas_vazias', 'multiple_deliveries', 'NaN ' ),
+    ( 'cidade_vazia', 'City', 'NaN ' ),
+    ( 'festival_vazio', 'Festival', 'NaN ' ),
+    ( 'trafego_vazio', 'Road_traffic_density', 'NaN ' ),
+]
+
+# Colunas de baixa cardinalidade convertidas para categorias com conjuntos fixos de valores.
+# Valores fora do conjunto ficam como ausentes na coluna categórica.
+CATEGORIAS = {
+    'City': [ 'Metropolitian', 'Urban', 'Semi-Urban' ],
+    'Road_traffic_density': [ 'Low', 'Medium', 'High', 'Jam' ],
+    'Type_of_order': [ 'Snack', 'Meal', 'Drinks', 'Buffet' ],
+    'Type_of_vehicle': [ 'motorcycle', 'scooter', 'electric_scooter', 'bicycle' ],
+    'Festival': [ 'No', 'Yes' ],
+    'Weatherconditions': [ 'Sunny', 'Stormy', 'Sandstorms', 'Cloudy', 'Fog', 'Windy' ],
+}
+
+def filtrar_sentinelas( df, regras=REGRAS_SENTINELA ):
+    """Esta função remove as linhas com valores sentinela em uma única passada
+
+        Cada regra gera uma máscara booleana; as máscaras são combinadas e aplicadas uma única vez,
+        sem dataframes intermediários. Retorna o dataframe filtrado e a quantidade de linhas marcadas
+        por cada regra ( uma linha pode ser marcada por mais de uma regra ).
+
+    """
+    descartar = np.zeros( len( df ), dtype=bool )
+    descartados = {}
+
+    for nome, coluna, valor in regras:
+        marcadas = ( df[coluna] == valor ).to_numpy()
+        descartados[nome] = int( marcadas.sum() )
+        descartar |= marcadas
+
+    # take() gera um novo dataframe independente ( sem SettingWithCopyWarning nas atribuições seguintes )
+    return df.take( np.flatnonzero( ~descartar ) ), descartados
+
+def somar_attrs( attrs, novos ):
+    """Soma os contadores da limpeza ( descartados, rejeitados ) de dois blocos
+
+        memoria_categorias não é somável ( as categorias de cada bloco seriam contadas de novo ): quem junta
+        blocos recalcula com economia_categorias sobre o dataframe resultante.
+    """
+    resultado = {}
+    for nome in set( attrs ) | set( novos ):
+        contadores = dict( attrs.get( nome, {} ) )
+        for chave, valor in novos.get( nome, {} ).items():
+            contadores[ chave ] = contadores.get( chave, 0 ) + valor
+        resultado[ nome ] = contadores
+
+    return resultado
+
+def economia_categorias( df ):
+    """Memória economizada ( em bytes ) por coluna categórica: a coluna como texto ( object ) menos a categórica
+
+        A memória como texto é calculada pelos códigos, sem converter a coluna: 8 bytes por referência mais o
+        tamanho da categoria de cada linha ( ausentes contam como float NaN ), igual ao memory_usage( deep=True )
+        da coluna convertida para object.
+    """
+    economia = {}
+    # Somente as colunas categóricas presentes ( o dataframe pode ser uma projeção do dataset limpo )
+    for coluna in [ c for c in CATEGORIAS if c in df.columns ]:
+        valores = df[coluna]
+        codigos = valores.cat.codes.to_numpy()
+        # Código -1 ( ausente ) indexa o último tamanho, o do NaN
+        tamanhos = np.array( [ sys.getsizeof( c ) for c in valores.cat.categories ] + [ sys.getsizeof( np.nan ) ], dtype=np.int64 )
+
+        como_texto = np.dtype( object ).itemsize * len( codigos ) + int( tamanhos[ codigos ].sum() )
+        economia[coluna] = como_texto - int( valores.memory_usage( index=False, deep=True ) )
+
+    return economia
+
+def clean_code( df_original ):
+    """Esta função tem a responsabilidade de limpar o dataframe
+
+        Tipos de limpeza:
+        1. Remoção dos dados NaN ( regras em REGRAS_SENTINELA )
+        2. Mudança do tipo da coluna de dados
+        3. Remoção dos espaços das variáveis de texto
+        4. Formatação da coluna de datas e colunas de calendário ISO ( "Order_Year", "Order_Week", "Order_Weekday" )
+        5. Limpeza da coluna de tempo ( Remoção do texto da variável numérica )
+        6. Criação da variável "Distance_km" que mostra a distância geográgica entre o restaurante e o endereço de entrega
+        7. Conversão das colunas de baixa cardinalidade ( CATEGORIAS ) para o tipo category
+        8. Ordenação das linhas por "Order_Date" ( base do índice de filtros em curry.indice )
+
+        As linhas descartadas por regra de NaN ficam em df.attrs['descartados'], as descartadas por valores
+        mal formatados em df.attrs['rejeitados'] e a memória economizada ( em bytes ) por coluna categórica
+        em df.attrs['memoria_categorias'] ( ver economia_categorias ). Cada passo é medido pela instrumentação ( curry.instrumentacao ).
+
+    """
+    passos = cronometro( 'limpeza', df_original )
+
+    #1.Excluir as linhas com valores vazios ( 'NaN ' ) com uma única máscara; o filtro já gera um novo dataframe ( sem cópia extra )
+    df, descartados = filtrar_sentinelas( df_original )
+    passos.marcar( '1_sentinelas', df )
+
+    #2.Removendo o espaço dos valores das colunas
+    df.loc[:, 'Delivery_person_ID'] = df.loc[:, 'Delivery_person_ID'].str.strip()
+    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
+    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
+    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
+    df.loc[:, 'Festival'] = df.loc[:, 'Festival'].str.strip()
+    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
+    passos.marcar( '2_espacos', df )
+
+    #3.Conversao de texto/categoria/string para numeros inteiros
+    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype( int )
+    passos.marcar( '3_idade', df )
+
+    #4.Conversao de texto/categoria/strings para numeros decimais
+    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype( float )
+    passos.marcar( '4_avaliacoes', df )
+
+    #5.Conversao de texto para data
+    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format='%d-%m-%Y' )
+    df['Order_Year'], df['Order_Week'], df['Order_Weekday'] = calendario_iso( df['Order_Date'] )
+    passos.marcar( '5_datas', df )
+
+    #6.Conversao da coluna multiple_deliveries para numeros inteiros ( os 'NaN ' já foram removidos no passo 1 )
+    df['multiple_deliveries'] = df['multiple_deliveries'].astype( int )
+    passos.marcar( '6_entregas_multiplas', df )
+
+    #7.Limpando a coluna de time taken ( '(min) 24' -> 24 ), linhas mal formatadas são descartadas e contadas
+    tempo, validos = converter_tempo_entrega( df['Time_taken(min)'] )
+    rejeitados = { 'Time_taken(min)': int( ( ~validos ).sum() ) }
+    df = df.take( np.flatnonzero( validos ) )
+    df['Time_taken(min)'] = tempo[ validos ].astype( int )
+    passos.marcar( '7_tempo_entrega', df )
+
+    #8.Removendo "conditions " do campo "Weatherconditions"
+    df['Weatherconditions'] = converter_clima( df['Weatherconditions'] )
+    passos.marcar( '8_clima', df )
+
+    #9.Criando coluna da distancia entre o restaurante e o endereço de entrega em quilômetros
+    df['Distance_km'] = haversine_vetorizado( df['Restaurant_latitude'].to_numpy(), df['Restaurant_longitude'].to_numpy(),
+                                              df['Delivery_location_latitude'].to_numpy(), df['Delivery_location_longitude'].to_numpy() )
+    passos.marcar( '9_distancia', df )
+
+    #10.Conversao das colunas de texto de baixa cardinalidade para categorias
+    for coluna, categorias in CATEGORIAS.items():
+        df[coluna] = pd.Categorical( df[coluna], categories=categorias )
+    passos.marcar( '10_categorias', df )
+
+    #11.Ordenando pela data do pedido ( ordenação estável, mantém a ordem original dentro do mesmo dia )
+    df = df.sort_values( 'Order_Date', kind='stable' )
+    passos.marcar( '11_ordenacao', df )
+
+    df.attrs['descartados'] = descartados
+    df.attrs['rejeitados'] = rejeitados
+    df.attrs['memoria_categorias'] = economia_categorias( df )
+
+    return df
@@ -0,0 +1,74 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import folium
+import numpy as np
+import pandas as pd
+from folium.plugins import HeatMap
+
+#==================================================================================================================================================================
+# Mapa de entregas agregado em grade ( uma única camada de calor )
+#==================================================================================================================================================================
+#
+# Um folium.Marker por entrega gera um objeto Python e um trecho de HTML/JS por linha. Aqui as coordenadas
+# são agrupadas em células de uma grade regular ( em graus ) de forma vetorizada e o mapa recebe uma única
+# camada HeatMap com um ponto por célula ( centróide + quantidade de entregas ). Se a quantidade de células
+# passar do limite do payload, o tamanho da célula é dobrado até caber.
+
+TAMANHO_CELULA_PADRAO = 0.005  # ~550 m no equador
+LIMITE_BYTES_PADRAO = 2_000_000
+
+# Estimativa do tamanho de um ponto [lat, lon, peso] no JSON da camada ( 5 casas decimais )
+BYTES_POR_PONTO = 32
+
+def agrupar_em_grade( latitudes, longitudes, tamanho_celula=TAMANHO_CELULA_PADRAO ):
+    """Esta função agrupa as coordenadas em células de "tamanho_celula" graus
+
+        Retorna um DataFrame com uma linha por célula ocupada: centróide ( lat, lon ) das entregas da
+        célula e a quantidade de entregas ( qtde ).
+    """
+    lat = np.asarray( latitudes, dtype=np.float64 )
+    lon = np.asarray( longitudes, dtype=np.float64 )
+
+    validos = np.isfinite( lat ) & np.isfinite( lon )
+    lat = lat[ validos ]
+    lon = lon[ validos ]
+
+    # Índice inteiro da célula em cada eixo, combinado em uma única chave int64
+    linha = np.floor( ( lat + 90.0 ) / tamanho_celula ).astype( np.int64 )
+    coluna = np.floor( ( lon + 180.0 ) / tamanho_celula ).astype( np.int64 )
+    chaves = linha * ( int( 360.0 / tamanho_celula ) + 1 ) + coluna
+
+    _, celula, qtde = np.unique( chaves, return_inverse=True, return_counts=True )
+
+    return pd.DataFrame( { 'lat': np.bincount( celula, weights=lat ) / qtde,
+                           'lon': np.bincount( celula, weights=lon ) / qtde,
+                           'qtde': qtde } )
+
+def grade_limitada( latitudes, longitudes, tamanho_celula=TAMANHO_CELULA_PADRAO, limite_bytes=LIMITE_BYTES_PADRAO ):
+    """Agrupa em grade dobrando o tamanho da célula até a camada caber em "limite_bytes"
+
+        Retorna a grade e o tamanho de célula usado.
+    """
+    max_pontos = max( 1, limite_bytes // BYTES_POR_PONTO )
+    grade = agrupar_em_grade( latitudes, longitudes, tamanho_celula )
+
+    while len( grade ) > max_pontos:
+        tamanho_celula *= 2
+        grade = agrupar_em_grade( latitudes, longitudes, tamanho_celula )
+
+    return grade, tamanho_celula
+
+def mapa_calor_entregas( latitudes, longitudes, tamanho_celula=TAMANHO_CELULA_PADRAO, limite_bytes=LIMITE_BYTES_PADRAO ):
+    """Esta função monta um folium.Map com todas as entregas em uma única camada HeatMap agregada em grade"""
+    grade, _ = grade_limitada( latitudes, longitudes, tamanho_celula, limite_bytes )
+
+    if grade.empty:
+        return folium.Map( zoom_start=11 )
+
+    pontos = np.column_stack( [ grade[ 'lat' ].to_numpy(), grade[ 'lon' ].to_numpy(), grade[ 'qtde' ] / grade[ 'qtde' ].max() ] )
+
+    mapa = folium.Map( location=[ float( np.median( grade[ 'lat' ] ) ), float( np.median( grade[ 'lon' ] ) ) ], zoom_start=5 )
+    HeatMap( np.round( pontos, 5 ).tolist(), radius=12, blur=10 ).add_to( mapa )
+
+    return mapa
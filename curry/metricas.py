@@ -0,0 +1,379 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import functools
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from curry import hll
+from curry.cache_resultados import memorizar
+from curry.cubo import SEMANA, carregar_cubo, rotulo_semana
+from curry.indice import carregar_indice
+from curry.ingestao import CAMINHO_DADOS, carregar_dados
+from curry.ingestao_blocos import MODO_STREAMING, FatiaAgregados, carregar_agregados, carregar_cubo_agregados
+from curry.instrumentacao import instrumentar
+from curry.ranking import top_k_por_grupo
+from curry.resolucao import reduzir_serie
+
+#==================================================================================================================================================================
+# Métricas do dashboard sem Streamlit
+#==================================================================================================================================================================
+#
+# Os números dos gráficos e tabelas das páginas, como funções puras que recebem o cubo fatiado ( Visão
+# Empresa ) ou o dataframe filtrado ( demais visões ) e devolvem um dataframe ou um dicionário. As páginas
+# só montam as figuras a partir desses resultados; o mesmo cálculo serve ao servidor HTTP ( curry.servidor )
+# e a execuções em lote com calcular( nome, ... ).
+#
+# Cada função fica registrada em METRICAS com a fonte dos dados ( 'cubo' ou 'dados' ), as colunas que
+# precisa ler e os parâmetros aceitos, e é memorizada pelo estado dos filtros ( curry.cache_resultados ):
+# o resultado é compartilhado e não deve ser alterado por quem o recebe.
+#
+# Modo streaming ( CURRY_STREAMING=1, ver curry.ingestao_blocos ): as métricas de fonte 'dados' também
+# aceitam os agregados fatiados ( FatiaAgregados ) no lugar do dataframe filtrado; a versão registrada com
+# @por_agregados calcula o mesmo resultado ( mesmas colunas ) a partir dos momentos acumulados.
+
+Metrica = namedtuple( 'Metrica', [ 'funcao', 'fonte', 'colunas', 'parametros', 'agregados' ], defaults=[ None ] )
+
+METRICAS = {}
+
+def _booleano( texto ):
+    """Converte o texto de um parâmetro ( 'true', '1', 'sim'... ) em bool"""
+    if isinstance( texto, bool ):
+        return texto
+
+    if str( texto ).lower() in ( 'true', '1', 'sim', 's' ):
+        return True
+    if str( texto ).lower() in ( 'false', '0', 'nao', 'não', 'n' ):
+        return False
+
+    raise ValueError( 'Valor booleano inválido: {}'.format( texto ) )
+
+def metrica( fonte, colunas=(), parametros=None ):
+    """Decorador: registra a função em METRICAS e a devolve memorizada e instrumentada
+
+        "parametros" mapeia o nome de cada argumento extra para a função que converte o texto recebido
+        ( ex.: na query string do servidor ) no tipo esperado.
+    """
+    def registrar( funcao ):
+        nome = funcao.__name__
+        linha_a_linha = memorizar( funcao )
+
+        @functools.wraps( funcao )
+        def despachar( entrada, *args, **kwargs ):
+            if isinstance( entrada, FatiaAgregados ):
+                if METRICAS[ nome ].agregados is None:
+                    raise ValueError( 'A métrica {} precisa dos dados linha a linha ( indisponível no modo streaming )'.format( nome ) )
+
+                return METRICAS[ nome ].agregados( entrada, *args, **kwargs )
+
+            return linha_a_linha( entrada, *args, **kwargs )
+
+        funcao_metrica = instrumentar( despachar, 'metricas.' + nome )
+        METRICAS[ nome ] = Metrica( funcao_metrica, fonte, list( colunas ), dict( parametros or {} ) )
+
+        return funcao_metrica
+
+    return registrar
+
+def por_agregados( nome ):
+    """Decorador: registra a versão da métrica "nome" calculada a partir dos agregados streaming ( FatiaAgregados )"""
+    def registrar( funcao ):
+        METRICAS[ nome ] = METRICAS[ nome ]._replace( agregados=memorizar( funcao ) )
+
+        return funcao
+
+    return registrar
+
+def _escalar( momentos, coluna, tipo=None ):
+    """Valor de "coluna" nos momentos sem dimensões ( uma linha, ou nenhuma com os filtros vazios )"""
+    if not len( momentos ) or not momentos[ 'n' ].iloc[0]:
+        return np.nan
+
+    valor = momentos[ coluna ].iloc[0]
+
+    return tipo( valor ) if tipo is not None else valor
+
+#==================================================================================================================================================================
+# Visão Empresa ( cubo de pedidos )
+#==================================================================================================================================================================
+
+@metrica( 'cubo' )
+def pedidos_dia( cubo ):
+    """Quantidade de pedidos por dia"""
+    df_aux = cubo.pedidos_por( [ 'Order_Date' ] )
+    df_aux.columns = [ 'Data_Entrega', 'Qtde_Entrega' ]
+
+    return df_aux
+
+@metrica( 'cubo', parametros={ 'maximo_pontos': int, 'modo': str } )
+def pedidos_periodo( cubo, maximo_pontos=None, modo='agregar' ):
+    """Pedidos por dia reduzidos a no máximo "maximo_pontos" pontos ( por semana, mês... ou LTTB, ver curry.resolucao )"""
+    return reduzir_serie( pedidos_dia( cubo ), 'Data_Entrega', 'Qtde_Entrega', maximo_pontos, modo )
+
+@metrica( 'cubo' )
+def pedidos_trafego( cubo ):
+    """Quantidade e percentual de pedidos por tipo de tráfego"""
+    df_aux = cubo.pedidos_por( [ 'Road_traffic_density' ] ).rename( columns={ 'Qtde_Pedidos': 'ID' } )
+    df_aux['Perc_per_traffic'] = 100 * ( df_aux[ 'ID' ] / df_aux[ 'ID' ].sum() )
+
+    return df_aux
+
+@metrica( 'cubo' )
+def pedidos_cidade_trafego( cubo ):
+    """Quantidade de pedidos por cidade e tipo de tráfego"""
+    return cubo.pedidos_por( [ 'City', 'Road_traffic_density' ] ).rename( columns={ 'Qtde_Pedidos': 'ID' } )
+
+@metrica( 'cubo' )
+def pedidos_semana( cubo ):
+    """Quantidade de pedidos por semana ISO ( rótulo 'AAAA-Snn' )"""
+    df_aux = cubo.pedidos_por( SEMANA )
+
+    return pd.DataFrame( { 'Semana do ano': rotulo_semana( df_aux ), 'Qtde entrega': df_aux['Qtde_Pedidos'] } )
+
+@metrica( 'cubo', parametros={ 'exato': _booleano } )
+def pedidos_entregador_semana( cubo, exato=None ):
+    """Pedidos, entregadores distintos ( HyperLogLog, ou exatos com exato=True ) e pedidos por entregador em cada semana ISO"""
+    df_aux1 = cubo.pedidos_por( SEMANA ).rename( columns={ 'Qtde_Pedidos': 'ID' } )
+    df_aux2 = cubo.entregadores_por_semana( exato )
+    df_aux = pd.merge( df_aux1, df_aux2, how='inner', on=SEMANA )
+
+    df_aux['Week_Year'] = rotulo_semana( df_aux )
+    df_aux['Order_by_deliver'] = df_aux[ 'ID' ] / df_aux[ 'Delivery_person_ID' ]
+
+    return df_aux
+
+@metrica( 'cubo', parametros={ 'exato': _booleano } )
+def entregadores_unicos( cubo, exato=None ):
+    """Entregadores distintos da fatia: estimativa HyperLogLog ( erro padrão relativo em 'erro_padrao' ) ou exata"""
+    exato = cubo.contagem_exata( exato )
+
+    return { 'entregadores_unicos': cubo.entregadores_distintos( exato ), 'exato': exato, 'erro_padrao': 0.0 if exato else hll.ERRO_PADRAO }
+
+@metrica( 'dados', colunas=[ 'City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude' ] )
+def localizacao_cidade_trafego( df ):
+    """Mediana da localização das entregas por cidade e tipo de tráfego"""
+    cols = [ 'City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude' ]
+
+    return df.loc[ :, cols ].groupby( [ 'City', 'Road_traffic_density' ], observed=True ).median().reset_index()
+
+#==================================================================================================================================================================
+# Visão Entregadores
+#==================================================================================================================================================================
+
+@metrica( 'dados', colunas=[ 'Delivery_person_Age', 'Vehicle_condition' ] )
+def metricas_entregadores( df ):
+    """Maior e menor idade dos entregadores e melhor e pior condição dos veículos"""
+    return { 'maior_idade': df['Delivery_person_Age'].max(),
+             'menor_idade': df['Delivery_person_Age'].min(),
+             'melhor_condicao_veiculo': df['Vehicle_condition'].max(),
+             'pior_condicao_veiculo': df['Vehicle_condition'].min() }
+
+@por_agregados( 'metricas_entregadores' )
+def _metricas_entregadores_agregados( fatia ):
+    idade, condicao = fatia.momentos( 'idade' ), fatia.momentos( 'condicao_veiculo' )
+
+    return { 'maior_idade': _escalar( idade, 'maximo', int ),
+             'menor_idade': _escalar( idade, 'minimo', int ),
+             'melhor_condicao_veiculo': _escalar( condicao, 'maximo', int ),
+             'pior_condicao_veiculo': _escalar( condicao, 'minimo', int ) }
+
+@metrica( 'dados', colunas=[ 'Delivery_person_ID', 'Delivery_person_Ratings', 'Road_traffic_density', 'Weatherconditions' ],
+          parametros={ 'tp_agrupamento': str } )
+def calc_avaliacoes( df, tp_agrupamento ):
+    """Avaliação média por entregador ou média e desvio padrão por trânsito ( 'transito' ) ou clima ( 'clima' )"""
+    if tp_agrupamento == 'entregador':
+        cols = [ 'Delivery_person_ID' , 'Delivery_person_Ratings' ]
+        df1 = df.loc[:, cols].groupby( [ 'Delivery_person_ID' ] ).mean().reset_index()
+
+    elif tp_agrupamento == 'transito':
+        cols = [ 'Delivery_person_Ratings' , 'Road_traffic_density' ]
+        df1 = df.loc[:, cols].groupby( [ 'Road_traffic_density' ], observed=True ).agg( Média = ( 'Delivery_person_Ratings', 'mean' ), Desvio_Padrão = ( 'Delivery_person_Ratings', 'std' ) ).reset_index()
+
+    elif tp_agrupamento == 'clima':
+        cols = [ 'Delivery_person_Ratings' , 'Weatherconditions' ]
+        df1 = df.loc[:, cols].groupby( [ 'Weatherconditions' ], observed=True ).agg( Média = ( 'Delivery_person_Ratings', 'mean' ), Desvio_Padrão = ( 'Delivery_person_Ratings', 'std' ) ).reset_index()
+
+    else:
+        raise ValueError( 'Agrupamento desconhecido: {}'.format( tp_agrupamento ) )
+
+    return df1
+
+# Momentos de Delivery_person_Ratings de cada agrupamento das avaliações
+MOMENTOS_AVALIACOES = { 'entregador': 'avaliacao_entregador', 'transito': 'avaliacao_transito', 'clima': 'avaliacao_clima' }
+
+@por_agregados( 'calc_avaliacoes' )
+def _calc_avaliacoes_agregados( fatia, tp_agrupamento ):
+    if tp_agrupamento not in MOMENTOS_AVALIACOES:
+        raise ValueError( 'Agrupamento desconhecido: {}'.format( tp_agrupamento ) )
+
+    nome = MOMENTOS_AVALIACOES[ tp_agrupamento ]
+    momentos = fatia.momentos( nome )
+
+    if tp_agrupamento == 'entregador':
+        return momentos.loc[ :, fatia.dimensoes( nome ) + [ 'media' ] ].rename( columns={ 'media': 'Delivery_person_Ratings' } )
+
+    return momentos.loc[ :, fatia.dimensoes( nome ) + [ 'media', 'desvio_padrao' ] ].rename( columns={ 'media': 'Média', 'desvio_padrao': 'Desvio_Padrão' } )
+
+@metrica( 'dados', colunas=[ 'City', 'Delivery_person_ID', 'Time_taken(min)' ],
+          parametros={ 'tp_entregador': str, 'asc_bool': _booleano, 'k': int } )
+def calc_top_entregadores( df, tp_entregador, asc_bool, k=10 ):
+    """Os k entregadores mais rápidos ( 'R', menor tempo ) ou mais lentos ( 'L', maior tempo ) de cada cidade"""
+    if tp_entregador == 'R': #Entregadores mais rápidos
+        agregacao = 'min'
+
+    elif tp_entregador == 'L': #Entregadores mais lentos
+        agregacao = 'max'
+
+    else:
+        raise ValueError( 'Tipo de entregador desconhecido: {}'.format( tp_entregador ) )
+
+    # k melhores por cidade ( qualquer cidade presente nos dados ), com seleção parcial em vez de ordenação completa
+    return top_k_por_grupo( df, 'City', 'Delivery_person_ID', 'Time_taken(min)', k=k, menores=asc_bool, agregacao=agregacao )
+
+@por_agregados( 'calc_top_entregadores' )
+def _calc_top_entregadores_agregados( fatia, tp_entregador, asc_bool, k=10 ):
+    if tp_entregador not in ( 'R', 'L' ):
+        raise ValueError( 'Tipo de entregador desconhecido: {}'.format( tp_entregador ) )
+
+    # Menor ( 'R' ) ou maior ( 'L' ) tempo de cada par cidade x entregador já está nos momentos
+    extremo = 'minimo' if tp_entregador == 'R' else 'maximo'
+    momentos = fatia.momentos( 'tempo_entregador_cidade' )
+    df_aux = pd.DataFrame( { 'City': momentos['City'], 'Delivery_person_ID': momentos['Delivery_person_ID'],
+                             'Time_taken(min)': momentos[ extremo ].astype( np.int64 ) } )
+
+    return top_k_por_grupo( df_aux, 'City', 'Delivery_person_ID', 'Time_taken(min)', k=k, menores=asc_bool, agregacao='min' if tp_entregador == 'R' else 'max' )
+
+#==================================================================================================================================================================
+# Visão Restaurantes
+#==================================================================================================================================================================
+
+@metrica( 'dados', colunas=[ 'Time_taken(min)', 'City', 'Road_traffic_density', 'Distance_km', 'Type_of_order' ],
+          parametros={ 'tp_grafico': str } )
+def calc_tempo_medio_dp_cidade( df, tp_grafico ):
+    """Tempo médio e desvio padrão de entrega por cidade ( 'barras' ), cidade e tráfego ( 'solar' ) ou cidade e
+    tipo de pedido ( 'tabela' ); distância média por cidade ( 'pizza' )"""
+    agregacao = dict( Tempo_Médio_Entrega = ('Time_taken(min)', 'mean'), Desvio_Padrão = ('Time_taken(min)', 'std') )
+
+    if tp_grafico == 'barras':
+        dimensoes = [ 'City' ]
+
+    elif tp_grafico == 'solar':
+        dimensoes = [ 'City', 'Road_traffic_density' ]
+
+    elif tp_grafico == 'tabela':
+        dimensoes = [ 'City', 'Type_of_order' ]
+
+    elif tp_grafico == 'pizza':
+        return df.loc[ :, [ 'Distance_km', 'City' ] ].groupby( ['City'], observed=True ).mean().reset_index()
+
+    else:
+        raise ValueError( 'Tipo de gráfico desconhecido: {}'.format( tp_grafico ) )
+
+    return df.loc[ :, [ 'Time_taken(min)' ] + dimensoes ].groupby( dimensoes, observed=True ).agg( **agregacao ).reset_index()
+
+# Momentos de cada gráfico de calc_tempo_medio_dp_cidade ( 'pizza' é a distância, os demais o tempo de entrega )
+MOMENTOS_GRAFICOS = { 'barras': 'tempo_cidade', 'solar': 'tempo_cidade_trafego', 'tabela': 'tempo_cidade_pedido', 'pizza': 'distancia_cidade' }
+
+@por_agregados( 'calc_tempo_medio_dp_cidade' )
+def _calc_tempo_medio_dp_cidade_agregados( fatia, tp_grafico ):
+    if tp_grafico not in MOMENTOS_GRAFICOS:
+        raise ValueError( 'Tipo de gráfico desconhecido: {}'.format( tp_grafico ) )
+
+    nome = MOMENTOS_GRAFICOS[ tp_grafico ]
+    momentos = fatia.momentos( nome )
+
+    if tp_grafico == 'pizza':
+        return momentos.loc[ :, [ 'City', 'media' ] ].rename( columns={ 'media': 'Distance_km' } )
+
+    return momentos.loc[ :, fatia.dimensoes( nome ) + [ 'media', 'desvio_padrao' ] ].rename( columns={ 'media': 'Tempo_Médio_Entrega', 'desvio_padrao': 'Desvio_Padrão' } )
+
+@metrica( 'dados', colunas=[ 'Festival', 'Time_taken(min)', 'Distance_km' ] )
+def calc_metricas_gerais( df ):
+    """Calcula as métricas de distância e tempo do cabeçalho em uma única agregação agrupada por Festival
+
+        Retorna um dicionário com a distância média e, para cada valor de Festival ( 'sim' / 'nao' ), a
+        quantidade de pedidos, a média e o desvio padrão do tempo de entrega. Os entregadores únicos do
+        cabeçalho vêm dos esboços do cubo ( entregadores_unicos ).
+    """
+    df_aux = ( df.loc[ :, [ 'Festival', 'Time_taken(min)', 'Distance_km' ] ]
+                 .groupby( [ 'Festival' ], observed=True )
+                 .agg( Qtde = ( 'Time_taken(min)', 'count' ),
+                       Tempo_Médio = ( 'Time_taken(min)', 'mean' ),
+                       Desvio_Padrão = ( 'Time_taken(min)', 'std' ),
+                       Soma_Distancia = ( 'Distance_km', 'sum' ),
+                       Qtde_Distancia = ( 'Distance_km', 'count' ) ) )
+
+    metricas = { 'distancia_media': round( df_aux[ 'Soma_Distancia' ].sum() / df_aux[ 'Qtde_Distancia' ].sum(), 2 ) if len( df_aux ) else np.nan }
+
+    for festival, op_fest in [ ( 'sim', 'Yes' ), ( 'nao', 'No' ) ]:
+        if op_fest in df_aux.index:
+            linha = df_aux.loc[ op_fest ]
+            metricas[ festival ] = { 'qtde': int( linha[ 'Qtde' ] ), 'media': round( linha[ 'Tempo_Médio' ], 2 ), 'desvio_padrao': round( linha[ 'Desvio_Padrão' ], 2 ) }
+        else:
+            metricas[ festival ] = { 'qtde': 0, 'media': np.nan, 'desvio_padrao': np.nan }
+
+    return metricas
+
+@por_agregados( 'calc_metricas_gerais' )
+def _calc_metricas_gerais_agregados( fatia ):
+    distancia = _escalar( fatia.momentos( 'distancia' ), 'media' )
+    metricas = { 'distancia_media': round( distancia, 2 ) if np.isfinite( distancia ) else np.nan }
+
+    tempos = fatia.momentos( 'tempo_festival' ).set_index( 'Festival' )
+
+    for festival, op_fest in [ ( 'sim', 'Yes' ), ( 'nao', 'No' ) ]:
+        if op_fest in tempos.index:
+            linha = tempos.loc[ op_fest ]
+            metricas[ festival ] = { 'qtde': int( linha[ 'n' ] ), 'media': round( linha[ 'media' ], 2 ), 'desvio_padrao': round( linha[ 'desvio_padrao' ], 2 ) }
+        else:
+            metricas[ festival ] = { 'qtde': 0, 'media': np.nan, 'desvio_padrao': np.nan }
+
+    return metricas
+
+#==================================================================================================================================================================
+# Execução sem Streamlit ( lote e servidor HTTP )
+#==================================================================================================================================================================
+
+def filtros_padrao( caminho=CAMINHO_DADOS, data_limite=None, trafegos=None ):
+    """Completa os filtros ausentes: todo o período ( até o dia seguinte à última data ) e todos os tráfegos"""
+    if MODO_STREAMING:
+        contagens = carregar_agregados( caminho ).contagens
+        datas = contagens['Order_Date'].to_numpy( dtype='datetime64[ns]' ) if contagens is not None else []
+        niveis = contagens['Road_traffic_density'].unique() if contagens is not None else []
+    else:
+        indice = carregar_indice( caminho )
+        datas, niveis = indice.datas, indice.posicoes_trafego
+
+    if data_limite is None:
+        data_limite = pd.Timestamp( max( datas ) ) + pd.Timedelta( days=1 ) if len( datas ) else pd.Timestamp.max
+    if trafegos is None:
+        trafegos = list( niveis )
+
+    return pd.Timestamp( data_limite ), list( trafegos )
+
+def calcular( nome, caminho=CAMINHO_DADOS, data_limite=None, trafegos=None, **parametros ):
+    """Esta função calcula a métrica "nome" sem Streamlit
+
+        Carrega o dataset ( ou o cubo ) do cache do processo, aplica os mesmos filtros da barra lateral
+        ( Order_Date < data_limite e tráfego em "trafegos", por padrão sem filtro ) e chama a função
+        registrada com os "parametros". Ex.: calcular( 'calc_top_entregadores', tp_entregador='R', asc_bool=True ).
+        No modo streaming a entrada vem dos agregados ( cubo e momentos ), sem carregar o dataset limpo.
+    """
+    if nome not in METRICAS:
+        raise KeyError( 'Métrica desconhecida: {}'.format( nome ) )
+
+    metrica = METRICAS[ nome ]
+    data_limite, trafegos = filtros_padrao( caminho, data_limite, trafegos )
+
+    if metrica.fonte == 'cubo':
+        cubo = carregar_cubo_agregados( caminho ) if MODO_STREAMING else carregar_cubo( caminho )
+        entrada = cubo.fatiar( data_limite, trafegos )
+    elif MODO_STREAMING:
+        entrada = carregar_agregados( caminho ).fatiar( data_limite, trafegos )
+    else:
+        indice = carregar_indice( caminho )
+        entrada = indice.filtrar( carregar_dados( caminho, colunas=metrica.colunas ), data_limite, trafegos )
+
+    return metrica.funcao( entrada, **parametros )
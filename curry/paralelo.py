@@ -0,0 +1,108 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
+from curry.leitura import cabecalho, fim_ultima_linha, ler_csv_intervalo
+from curry.limpeza import clean_code, economia_categorias, somar_attrs
+
+#==================================================================================================================================================================
+# Limpeza paralela do csv por intervalos de bytes ( um processo por partição )
+#==================================================================================================================================================================
+#
+# O trecho do csv é dividido em "processos" intervalos de bytes, sempre em fins de linha. Cada processo
+# lê e limpa o seu intervalo e grava o resultado em um arquivo Arrow IPC temporário; o processo principal
+# abre os arquivos com memory map ( sem pickle dos dataframes ), junta as partições na ordem do arquivo e
+# refaz a ordenação estável por data. O resultado é idêntico ao da limpeza serial: mesmas linhas, tipos,
+# índice ( posição da linha no csv ) e ordem. Os contadores descartados e rejeitados de df.attrs são somados
+# entre as partições e memoria_categorias é recalculada sobre o resultado, como na limpeza serial.
+#
+# A quantidade de processos vem do parâmetro ou da variável de ambiente CURRY_PROCESSOS ( padrão 1 =
+# limpeza serial, sem pool ). Campos com quebra de linha entre aspas não são suportados ( o train.csv não tem ).
+
+PROCESSOS = int( os.environ.get( 'CURRY_PROCESSOS', '1' ) )
+
+def intervalos_csv( caminho, partes, inicio=0, fim=None ):
+    """Divide os bytes [ inicio, fim ) do csv em até "partes" intervalos terminados em fim de linha
+
+        Com inicio=0 o cabeçalho fica na primeira partição, junto com pelo menos uma linha de dados.
+    """
+    fim = fim_ultima_linha( caminho ) if fim is None else fim
+    minimo = inicio
+
+    if inicio == 0:
+        with open( caminho, 'rb' ) as arquivo:
+            minimo = len( arquivo.readline() )
+
+    cortes = [ fim_ultima_linha( caminho, inicio + ( fim - inicio ) * k // partes ) for k in range( 1, partes ) ]
+    limites = [ inicio ] + sorted( set( c for c in cortes if minimo < c < fim ) ) + [ fim ]
+
+    return [ ( a, b ) for a, b in zip( limites[ :-1 ], limites[ 1: ] ) if b > a ]
+
+def _limpar_particao( caminho, inicio, fim, colunas, destino ):
+    """Executada no processo filho: lê e limpa o intervalo e grava o resultado em Arrow IPC em "destino"
+
+        Retorna apenas ( linhas brutas lidas, df.attrs ); o índice fica numerado a partir de 0 na partição.
+    """
+    df_original = ler_csv_intervalo( caminho, inicio, fim, colunas )
+    df = clean_code( df_original )
+
+    tabela = pa.Table.from_pandas( df, preserve_index=True )
+    with pa.OSFile( destino, 'wb' ) as arquivo, pa.ipc.new_file( arquivo, tabela.schema ) as escritor:
+        escritor.write_table( tabela )
+
+    return len( df_original ), df.attrs
+
+def limpar_intervalo( caminho, inicio=0, fim=None, processos=None, primeira_linha=0 ):
+    """Esta função lê e limpa as linhas do csv contidas nos bytes [ inicio, fim ), em paralelo
+
+        "primeira_linha" é a posição ( no csv ) da primeira linha do intervalo: o índice do resultado é a
+        posição de cada linha no csv, como no clean_code do arquivo inteiro.
+        Retorna ( dataframe limpo, quantidade de linhas brutas lidas ).
+    """
+    fim = fim_ultima_linha( caminho ) if fim is None else fim
+    processos = PROCESSOS if processos is None else processos
+    colunas = cabecalho( caminho ) if inicio > 0 else None
+    intervalos = intervalos_csv( caminho, processos, inicio, fim ) if processos > 1 else [ ( inicio, fim ) ]
+
+    if len( intervalos ) <= 1:
+        df_original = ler_csv_intervalo( caminho, inicio, fim, colunas )
+        df_original.index = pd.RangeIndex( primeira_linha, primeira_linha + len( df_original ) )
+
+        return clean_code( df_original ), len( df_original )
+
+    colunas = cabecalho( caminho )
+    contexto = multiprocessing.get_context( 'spawn' )  # seguro com as threads do Streamlit
+
+    with tempfile.TemporaryDirectory( prefix='curry_' ) as pasta, \
+         ProcessPoolExecutor( max_workers=min( processos, len( intervalos ) ), mp_context=contexto ) as pool:
+        destinos = [ os.path.join( pasta, '{}.arrow'.format( k ) ) for k in range( len( intervalos ) ) ]
+        futuros = [ pool.submit( _limpar_particao, caminho, a, b, None if a == 0 else colunas, destino )
+                    for ( a, b ), destino in zip( intervalos, destinos ) ]
+
+        partes = []
+        attrs = {}
+        linhas = primeira_linha
+
+        for futuro, destino in zip( futuros, destinos ):
+            linhas_particao, attrs_particao = futuro.result()
+
+            with pa.memory_map( destino ) as fonte:
+                parte = pa.ipc.open_file( fonte ).read_all().to_pandas()
+
+            parte.index = parte.index + linhas
+            linhas += linhas_particao
+            attrs = somar_attrs( attrs, attrs_particao )
+            partes.append( parte )
+
+    # Mesma ordenação estável do passo 11 do clean_code sobre as partições na ordem do arquivo
+    df = pd.concat( partes ).sort_values( 'Order_Date', kind='stable' )
+    df.attrs.update( attrs, memoria_categorias=economia_categorias( df ) )
+
+    return df, linhas - primeira_linha
@@ -0,0 +1,32 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import pandas as pd
+
+#==================================================================================================================================================================
+# Ranking top-k por grupo
+#==================================================================================================================================================================
+
+def top_k_por_grupo( df, grupo, chave, valor, k=10, menores=True, agregacao='min' ):
+    """Esta função retorna os k melhores valores de cada grupo ( ex.: 10 entregadores mais rápidos por cidade )
+
+        1. Uma única passada agrupada calcula "agregacao" de "valor" por ( grupo, chave )
+        2. Em cada grupo é feita uma seleção parcial ( nsmallest / nlargest, baseada em heap ), O(n log k),
+           em vez de ordenar o resultado inteiro
+
+        Os grupos são os encontrados nos dados ( na ordem das categorias quando "grupo" é categórico ).
+        k precisa ser pelo menos 1 ( ValueError caso contrário ).
+    """
+    if k < 1:
+        raise ValueError( 'k deve ser maior ou igual a 1: {}'.format( k ) )
+
+    df_aux = df.loc[ :, [ grupo, chave, valor ] ].groupby( [ grupo, chave ], observed=True )[ valor ].agg( agregacao ).reset_index()
+
+    selecionar = pd.DataFrame.nsmallest if menores else pd.DataFrame.nlargest
+    partes = [ selecionar( df_grupo, k, valor ) for _, df_grupo in df_aux.groupby( grupo, observed=True ) ]
+
+    if not partes:
+        return df_aux.iloc[ :0 ]
+
+    # Ordenação estável pelo grupo: mantém o ranking dentro de cada grupo ( só k linhas por grupo )
+    return pd.concat( partes ).sort_values( grupo, kind='stable' ).reset_index( drop=True )
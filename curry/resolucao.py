@@ -0,0 +1,98 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import os
+
+import numpy as np
+
+#==================================================================================================================================================================
+# Nível de detalhe das séries temporais ( quantidade de pontos enviada ao navegador )
+#==================================================================================================================================================================
+#
+# Uma série diária cresce com o período selecionado no slider de data. Para manter o gráfico com no máximo
+# MAXIMO_PONTOS pontos ( variável de ambiente CURRY_MAXIMO_PONTOS, padrão 400 ) a série é reduzida:
+#
+#   - modo 'agregar' ( padrão ): usa a menor resolução que cabe no limite, dia -> semana ( a partir da segunda-
+#     feira ) -> mês -> grupos de meses, somando os valores de cada período ( os totais não mudam );
+#   - modo 'lttb': mantém pontos diários escolhidos pelo Largest-Triangle-Three-Buckets, que preserva picos
+#     e vales da forma da série ( para gráficos de linha; os pontos descartados não são somados ).
+#
+# Com o período dentro do limite a série diária é devolvida sem alteração.
+
+MAXIMO_PONTOS = int( os.environ.get( 'CURRY_MAXIMO_PONTOS', '400' ) )
+
+MODOS = [ 'agregar', 'lttb' ]
+
+# ( resolução, regra do resample ); os grupos de meses são tentados depois do mês
+RESOLUCOES = [ ( 'semana', 'W-MON' ), ( 'mes', 'MS' ) ]
+
+def lttb( x, y, pontos ):
+    """Posições dos "pontos" selecionados pelo Largest-Triangle-Three-Buckets ( primeiro e último sempre mantidos )
+
+        x e y são arrays numéricos com x crescente. Os pontos internos são divididos em pontos - 2 grupos; em
+        cada grupo fica o ponto que forma o maior triângulo com o ponto escolhido no grupo anterior e a
+        média do grupo seguinte.
+    """
+    n = len( x )
+    if pontos >= n:
+        return np.arange( n )
+    if pontos < 3:
+        return np.array( [ 0, n - 1 ][ :pontos ], dtype=np.int64 )
+
+    x = np.asarray( x, dtype=np.float64 )
+    y = np.asarray( y, dtype=np.float64 )
+    limites = np.linspace( 1, n - 1, pontos - 1 ).astype( np.int64 )
+
+    escolhidos = np.empty( pontos, dtype=np.int64 )
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+
+    for k in range( pontos - 2 ):
+        inicio, fim = limites[k], limites[k + 1]
+        proximo_fim = limites[k + 2] if k + 2 < len( limites ) else n
+        media_x = x[ fim:proximo_fim ].mean()
+        media_y = y[ fim:proximo_fim ].mean()
+
+        a = escolhidos[k]
+        areas = np.abs( ( x[a] - media_x ) * ( y[ inicio:fim ] - y[a] ) - ( x[a] - x[ inicio:fim ] ) * ( media_y - y[a] ) )
+        escolhidos[k + 1] = inicio + int( np.argmax( areas ) )
+
+    return escolhidos
+
+def _agregar( serie, maximo_pontos ):
+    """Soma a série diária na menor resolução com no máximo "maximo_pontos" períodos"""
+    for resolucao, regra in RESOLUCOES:
+        agregada = serie.resample( regra, label='left', closed='left' ).sum()
+        if len( agregada ) <= maximo_pontos:
+            return agregada, resolucao
+
+    # Mais meses do que o limite: grupos de "meses" meses
+    quantidade_meses = len( serie.resample( 'MS' ).sum() )
+    meses = -( -quantidade_meses // maximo_pontos )
+
+    return serie.resample( '{}MS'.format( meses ), label='left', closed='left' ).sum(), '{} meses'.format( meses )
+
+def reduzir_serie( df, coluna_data, coluna_valor, maximo_pontos=None, modo='agregar' ):
+    """Esta função reduz uma série diária ( uma linha por data, ordenada ) a no máximo "maximo_pontos" pontos
+
+        Retorna um novo dataframe com as mesmas duas colunas e a coluna 'Resolucao' ( 'dia', 'semana', 'mes',
+        'N meses' ou 'lttb' ); no modo 'agregar' cada data é o início do período somado.
+    """
+    maximo_pontos = MAXIMO_PONTOS if maximo_pontos is None else maximo_pontos
+
+    if modo not in MODOS:
+        raise ValueError( 'Modo de redução desconhecido: {}'.format( modo ) )
+    if maximo_pontos < 1:
+        raise ValueError( 'O limite de pontos precisa ser positivo: {}'.format( maximo_pontos ) )
+
+    if len( df ) <= maximo_pontos:
+        return df.loc[ :, [ coluna_data, coluna_valor ] ].assign( Resolucao='dia' )
+
+    if modo == 'lttb':
+        datas = df[ coluna_data ].to_numpy( dtype='datetime64[ns]' ).astype( np.int64 )
+        posicoes = lttb( datas, df[ coluna_valor ].to_numpy(), maximo_pontos )
+
+        return df.iloc[ posicoes ].loc[ :, [ coluna_data, coluna_valor ] ].reset_index( drop=True ).assign( Resolucao='lttb' )
+
+    agregada, resolucao = _agregar( df.set_index( coluna_data )[ coluna_valor ], maximo_pontos )
+
+    return agregada.rename_axis( coluna_data ).reset_index().assign( Resolucao=resolucao )
@@ -0,0 +1,201 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import argparse
+import hashlib
+import json
+import logging
+import math
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from curry.cache_resultados import CacheResultados, normalizar_filtro
+from curry.ingestao import CAMINHO_DADOS, chave_arquivo
+from curry.limpeza import VERSAO_LIMPEZA
+from curry.metricas import METRICAS, calcular, filtros_padrao
+
+#==================================================================================================================================================================
+# Servidor HTTP/JSON local das métricas ( curry.metricas )
+#==================================================================================================================================================================
+#
+# Uso: python -m curry.servidor [ --host 127.0.0.1 ] [ --porta 8502 ] [ --dados dataset/train.csv ]
+#
+#   GET /metricas                      -> métricas disponíveis ( fonte, colunas e parâmetros )
+#   GET /metricas/<nome>?data_limite=2022-04-13&trafegos=Low,Jam&<parâmetro>=<valor>
+#                                      -> { "metrica", "filtros", "parametros", "dados" }
+#
+# Sem data_limite/trafegos a métrica usa todo o período e todos os tráfegos. O ETag da resposta é o hash
+# da versão do arquivo de origem ( caminho, mtime, tamanho ), da versão da limpeza, da métrica e dos
+# filtros/parâmetros normalizados: é conhecido antes do cálculo, então um If-None-Match igual recebe 304
+# sem calcular nada. O corpo JSON já serializado fica em um cache LRU pelo mesmo ETag.
+#
+# Erros do cliente ( métrica / rota desconhecida, parâmetro inválido ) respondem 4xx e qualquer outra falha
+# responde 500, sempre com o corpo JSON { "erro": mensagem }.
+
+HOST_PADRAO = '127.0.0.1'
+PORTA_PADRAO = 8502
+TAMANHO_CACHE_RESPOSTAS = 256
+
+logger = logging.getLogger( 'curry.servidor' )
+
+class ErroRequisicao( Exception ):
+    """Erro do cliente: vira uma resposta JSON com o status informado"""
+
+    def __init__( self, status, mensagem ):
+        super().__init__( mensagem )
+        self.status = status
+
+def _nativo( valor ):
+    """Converte escalares numpy/pandas e NaN em tipos aceitos pelo json ( NaN vira null )"""
+    if isinstance( valor, dict ):
+        return { str( k ): _nativo( v ) for k, v in valor.items() }
+    if isinstance( valor, ( list, tuple ) ):
+        return [ _nativo( v ) for v in valor ]
+    if isinstance( valor, pd.Timestamp ):
+        return valor.isoformat()
+    if isinstance( valor, np.generic ):
+        valor = valor.item()
+    if isinstance( valor, float ) and not math.isfinite( valor ):
+        return None
+
+    return valor
+
+def serializar( metrica, filtros, parametros, resultado ):
+    """Monta o corpo JSON ( bytes ) da resposta; dataframes viram uma lista de registros"""
+    cabecalho = json.dumps( { 'metrica': metrica, 'filtros': filtros, 'parametros': _nativo( parametros ) }, ensure_ascii=False )
+
+    if isinstance( resultado, pd.DataFrame ):
+        dados = resultado.to_json( orient='records', date_format='iso', force_ascii=False )
+    else:
+        dados = json.dumps( _nativo( resultado ), ensure_ascii=False )
+
+    return ( cabecalho[ :-1 ] + ', "dados": ' + dados + '}' ).encode( 'utf-8' )
+
+def _parametros( nome, consulta ):
+    """Separa os filtros e converte os parâmetros da query string ( erro 400 para valores inválidos )"""
+    if nome not in METRICAS:
+        raise ErroRequisicao( 404, 'Métrica desconhecida: {}'.format( nome ) )
+
+    conversores = METRICAS[ nome ].parametros
+    valores = { k: v[-1] for k, v in consulta.items() }
+
+    try:
+        data_limite = pd.Timestamp( valores.pop( 'data_limite' ) ) if 'data_limite' in valores else None
+        trafegos = [ t for t in valores.pop( 'trafegos' ).split( ',' ) if t ] if 'trafegos' in valores else None
+
+        desconhecidos = set( valores ) - set( conversores )
+        if desconhecidos:
+            raise ValueError( 'Parâmetros desconhecidos: {}'.format( ', '.join( sorted( desconhecidos ) ) ) )
+
+        parametros = { k: conversores[ k ]( v ) for k, v in valores.items() }
+
+    except ValueError as erro:
+        raise ErroRequisicao( 400, str( erro ) )
+
+    return data_limite, trafegos, parametros
+
+class ManipuladorMetricas( BaseHTTPRequestHandler ):
+    """Responde às rotas /metricas e /metricas/<nome> do ServidorMetricas"""
+
+    server_version = 'CurryMetricas/1.0'
+
+    def do_GET( self ):
+        url = urlsplit( self.path )
+        partes = [ p for p in url.path.split( '/' ) if p ]
+
+        try:
+            if partes == [ 'metricas' ]:
+                self._responder( 200, self._catalogo() )
+
+            elif len( partes ) == 2 and partes[0] == 'metricas':
+                self._metrica( partes[1], parse_qs( url.query ) )
+
+            else:
+                raise ErroRequisicao( 404, 'Rota desconhecida: {}'.format( url.path ) )
+
+        except ErroRequisicao as erro:
+            self._erro( erro.status, str( erro ) )
+
+        except Exception as erro:
+            # Falha inesperada no cálculo: o traceback vai para o log do servidor e o cliente recebe um JSON
+            logger.exception( 'Erro ao responder %s', self.path )
+            self._erro( 500, 'Erro interno: {}'.format( erro ) )
+
+    def _erro( self, status, mensagem ):
+        self._responder( status, json.dumps( { 'erro': mensagem }, ensure_ascii=False ).encode( 'utf-8' ) )
+
+    def _catalogo( self ):
+        catalogo = { nome: { 'fonte': m.fonte, 'colunas': m.colunas, 'parametros': sorted( m.parametros ) } for nome, m in METRICAS.items() }
+        return json.dumps( catalogo, ensure_ascii=False ).encode( 'utf-8' )
+
+    def _metrica( self, nome, consulta ):
+        data_limite, trafegos, parametros = _parametros( nome, consulta )
+        caminho = self.server.caminho
+
+        data_limite, trafegos = filtros_padrao( caminho, data_limite, trafegos )
+        estado = normalizar_filtro( chave_arquivo( caminho ), data_limite, trafegos )
+
+        identificacao = repr( ( VERSAO_LIMPEZA, nome, estado, sorted( parametros.items() ) ) )
+        etag = '"{}"'.format( hashlib.sha1( identificacao.encode( 'utf-8' ) ).hexdigest() )
+
+        if etag in [ e.strip() for e in self.headers.get( 'If-None-Match', '' ).split( ',' ) ]:
+            self._responder( 304, None, etag )
+            return
+
+        def construir():
+            try:
+                resultado = calcular( nome, caminho, data_limite, trafegos, **parametros )
+            except ( ValueError, TypeError ) as erro:
+                raise ErroRequisicao( 400, str( erro ) )
+
+            filtros = { 'data_limite': str( data_limite.date() ), 'trafegos': estado[2] }
+            return serializar( nome, filtros, parametros, resultado )
+
+        self._responder( 200, self.server.respostas.obter( etag, construir ), etag )
+
+    def _responder( self, status, corpo, etag=None ):
+        self.send_response( status )
+        if etag is not None:
+            self.send_header( 'ETag', etag )
+            # O cliente pode guardar a resposta, mas revalida a cada uso ( 304 enquanto o ETag valer )
+            self.send_header( 'Cache-Control', 'no-cache' )
+        if corpo is not None:
+            self.send_header( 'Content-Type', 'application/json; charset=utf-8' )
+            self.send_header( 'Content-Length', str( len( corpo ) ) )
+        self.end_headers()
+
+        if corpo is not None:
+            self.wfile.write( corpo )
+
+class ServidorMetricas( ThreadingHTTPServer ):
+    """Servidor HTTP das métricas de um dataset, com cache das respostas já serializadas"""
+
+    daemon_threads = True
+
+    def __init__( self, endereco, caminho=CAMINHO_DADOS, tamanho_cache=TAMANHO_CACHE_RESPOSTAS ):
+        super().__init__( endereco, ManipuladorMetricas )
+        self.caminho = caminho
+        self.respostas = CacheResultados( tamanho_cache )
+
+def main( argumentos=None ):
+    parser = argparse.ArgumentParser( description='Servidor HTTP/JSON das métricas do dashboard' )
+    parser.add_argument( '--host', default=HOST_PADRAO )
+    parser.add_argument( '--porta', type=int, default=PORTA_PADRAO )
+    parser.add_argument( '--dados', default=CAMINHO_DADOS, help='csv de origem ( padrão: CURRY_DADOS ou dataset/train.csv )' )
+    args = parser.parse_args( argumentos )
+
+    servidor = ServidorMetricas( ( args.host, args.porta ), args.dados )
+    print( 'Servindo as métricas de {} em http://{}:{}/metricas'.format( args.dados, args.host, args.porta ) )
+
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+if __name__ == '__main__':
+    main()
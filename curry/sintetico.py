@@ -0,0 +1,196 @@
+#==================================================================================================================================================================
+# Importação das bibliotecas necessárias para o trabalho
+#==================================================================================================================================================================
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+#==================================================================================================================================================================
+# Dataset sintético no formato do train.csv
+#==================================================================================================================================================================
+#
+# Uso: python -m curry.sintetico dataset/sintetico.csv --linhas 10000000 [ --semente 0 ] [ --dias 62 ]
+#      CURRY_DADOS=dataset/sintetico.csv streamlit run Home.py
+#
+# Gera linhas com o mesmo esquema e as mesmas "sujeiras" do csv original que o clean_code espera tratar:
+# espaços no fim dos textos, 'NaN ' nas colunas com valores vazios, 'conditions NaN' no clima e
+# '(min) NN' no tempo de entrega. As proporções das colunas categóricas ( cidade, tráfego, clima, veículo,
+# condição do veículo, entregas múltiplas, festival, tipo de pedido ), a taxa de idades vazias, a faixa de
+# idades e o período de 62 dias ( 11/02 a 13/04/2022 ) foram medidos no dataset/train.csv. Restaurantes,
+# avaliações e tempo de entrega são modelados: cada restaurante tem coordenadas fixas perto do centro da
+# sua cidade e o tempo de entrega cresce com a distância, o tráfego, o clima e o festival.
+#
+# O arquivo é escrito em blocos de "tamanho_bloco" linhas: a memória usada depende apenas do tamanho do
+# bloco, não da quantidade de linhas ( dezenas de GB são gerados com algumas centenas de MB de RAM ).
+
+TAMANHO_BLOCO_PADRAO = 200_000
+
+COLUNAS = [ 'ID', 'Delivery_person_ID', 'Delivery_person_Age', 'Delivery_person_Ratings', 'Restaurant_latitude', 'Restaurant_longitude',
+            'Delivery_location_latitude', 'Delivery_location_longitude', 'Order_Date', 'Time_Orderd', 'Time_Order_picked',
+            'Weatherconditions', 'Road_traffic_density', 'Vehicle_condition', 'Type_of_order', 'Type_of_vehicle', 'multiple_deliveries',
+            'Festival', 'City', 'Time_taken(min)' ]
+
+DATA_INICIAL_PADRAO = '2022-02-11'
+DIAS_PADRAO = 62
+
+# Cidades do dataset original: código usado no Delivery_person_ID e centro aproximado ( lat, lon )
+CIDADES = {
+    'INDO': ( 22.72, 75.86 ), 'BANG': ( 12.97, 77.59 ), 'COIMB': ( 11.02, 76.96 ), 'CHEN': ( 13.08, 80.27 ), 'HYD': ( 17.39, 78.49 ),
+    'RANCHI': ( 23.34, 85.31 ), 'MYS': ( 12.30, 76.64 ), 'DEH': ( 30.32, 78.03 ), 'KOC': ( 9.93, 76.27 ), 'PUNE': ( 18.52, 73.86 ),
+    'LUDH': ( 30.90, 75.86 ), 'KNP': ( 26.45, 80.33 ), 'MUM': ( 19.08, 72.88 ), 'KOL': ( 22.57, 88.36 ), 'JAP': ( 26.91, 75.79 ),
+    'SUR': ( 21.17, 72.83 ), 'GOA': ( 15.50, 73.83 ), 'AURG': ( 19.88, 75.34 ), 'AGR': ( 27.18, 78.01 ), 'VAD': ( 22.31, 73.18 ),
+    'ALH': ( 25.44, 81.85 ), 'BHP': ( 23.26, 77.41 ),
+}
+RESTAURANTES_POR_CIDADE = 20
+ENTREGADORES_POR_RESTAURANTE = 3
+
+# Distribuições ( valor no csv: probabilidade ), medidas nas 45.000 linhas do dataset/train.csv;
+# 'NaN ' é o sentinela de valor vazio do csv original
+TIPOS_CIDADE = { 'Metropolitian ': 0.676, 'Urban ': 0.246, 'Semi-Urban ': 0.049, 'NaN ': 0.03 }
+TRAFEGOS = { 'Low ': 0.25, 'Medium ': 0.247, 'High ': 0.247, 'Jam ': 0.246, 'NaN ': 0.01 }
+CLIMAS = { 'Sunny': 0.158, 'Stormy': 0.161, 'Sandstorms': 0.161, 'Cloudy': 0.159, 'Fog': 0.161, 'Windy': 0.16, 'NaN': 0.04 }
+TIPOS_PEDIDO = { 'Snack ': 0.252, 'Meal ': 0.252, 'Drinks ': 0.248, 'Buffet ': 0.248 }
+VEICULOS = { 'motorcycle ': 0.337, 'scooter ': 0.332, 'electric_scooter ': 0.331 }
+ENTREGAS_MULTIPLAS = { '0': 0.242, '1': 0.244, '2': 0.248, '3': 0.246, 'NaN ': 0.02 }
+FESTIVAIS = { 'No ': 0.974, 'Yes ': 0.021, 'NaN ': 0.005 }
+CONDICOES_VEICULO = { 0: 0.333, 1: 0.332, 2: 0.335 }
+
+PROPORCAO_IDADE_VAZIA = 0.041
+IDADE_MINIMA, IDADE_MAXIMA = 18, 39
+
+# Minutos acrescentados ao tempo de entrega
+ATRASO_TRAFEGO = { 'Low ': 0, 'Medium ': 5, 'High ': 7, 'Jam ': 12, 'NaN ': 6 }
+ATRASO_CLIMA = { 'Sunny': -3, 'Stormy': 3, 'Sandstorms': 3, 'Cloudy': 5, 'Fog': 5, 'Windy': 1, 'NaN': 0 }
+
+def _sortear( distribuicao, linhas, rng ):
+    """Sorteia "linhas" valores de uma distribuição { valor: probabilidade }"""
+    valores = list( distribuicao.keys() )
+    probabilidades = np.array( list( distribuicao.values() ) )
+
+    return np.array( valores, dtype=object )[ rng.choice( len( valores ), linhas, p=probabilidades / probabilidades.sum() ) ]
+
+# Textos formatados uma única vez e indexados por linha ( sem formatar texto linha a linha )
+HORARIOS = np.array( [ '{:02d}:{:02d}:00'.format( m // 60, m % 60 ) for m in range( 24 * 60 ) ], dtype=object )
+NUMEROS = np.array( [ str( n ) for n in range( 100 ) ], dtype=object )
+TEMPOS = np.array( [ '(min) {}'.format( n ) for n in range( 100 ) ], dtype=object )
+AVALIACOES = np.array( [ '{:.1f}'.format( n / 10 ) for n in range( 51 ) ], dtype=object )
+
+def restaurantes( semente=0 ):
+    """Tabela fixa de restaurantes: código da cidade, número do restaurante, IDs dos entregadores e coordenadas
+
+        Depende apenas da semente ( não do tamanho do bloco nem da quantidade de linhas ).
+    """
+    rng = np.random.default_rng( [ semente, 1 ] )
+    codigos = np.repeat( list( CIDADES.keys() ), RESTAURANTES_POR_CIDADE )
+    centros = np.repeat( np.array( list( CIDADES.values() ) ), RESTAURANTES_POR_CIDADE, axis=0 )
+
+    numeros = np.tile( np.arange( 1, RESTAURANTES_POR_CIDADE + 1 ), len( CIDADES ) )
+
+    return pd.DataFrame( { 'codigo': codigos,
+                           'numero': numeros,
+                           'entregadores': [ [ '{}RES{:02d}DEL{:02d} '.format( c, n, e ) for e in range( 1, ENTREGADORES_POR_RESTAURANTE + 1 ) ]
+                                             for c, n in zip( codigos, numeros ) ],
+                           'lat': np.round( centros[ :, 0 ] + rng.normal( 0, 0.04, len( codigos ) ), 6 ),
+                           'lon': np.round( centros[ :, 1 ] + rng.normal( 0, 0.04, len( codigos ) ), 6 ) } )
+
+def gerar_bloco( inicio, linhas, rng, tabela_restaurantes, data_inicial=DATA_INICIAL_PADRAO, dias=DIAS_PADRAO ):
+    """Gera "linhas" linhas sintéticas ( com ID a partir de "inicio" ) em um DataFrame de textos como no csv"""
+    posicoes = rng.integers( 0, len( tabela_restaurantes ), linhas )
+    restaurante = tabela_restaurantes.take( posicoes )
+    ids_entregadores = np.array( tabela_restaurantes['entregadores'].tolist(), dtype=object )
+    entregador = ids_entregadores[ posicoes, rng.integers( 0, ENTREGADORES_POR_RESTAURANTE, linhas ) ]
+
+    idade = NUMEROS[ rng.integers( IDADE_MINIMA, IDADE_MAXIMA + 1, linhas ) ]
+    idade_vazia = rng.random( linhas ) < PROPORCAO_IDADE_VAZIA
+    idade[ idade_vazia ] = 'NaN '
+
+    # Avaliações concentradas entre 4 e 5; sem idade a avaliação também fica vazia, como no csv original
+    avaliacao = AVALIACOES[ np.round( np.clip( 50 - rng.gamma( 1.5, 2.5, linhas ), 25, 50 ) ).astype( np.int64 ) ]
+    avaliacao[ idade_vazia ] = 'NaN '
+
+    lat = restaurante['lat'].to_numpy()
+    lon = restaurante['lon'].to_numpy()
+    lat_entrega = np.round( lat + rng.choice( [ -1, 1 ], linhas ) * rng.uniform( 0.01, 0.09, linhas ), 6 )
+    lon_entrega = np.round( lon + rng.choice( [ -1, 1 ], linhas ) * rng.uniform( 0.01, 0.09, linhas ), 6 )
+
+    datas = ( pd.Timestamp( data_inicial ) + pd.to_timedelta( np.arange( dias ), unit='D' ) ).strftime( '%d-%m-%Y' ).to_numpy( dtype=object )
+
+    # Pedidos concentrados no almoço e no jantar
+    pico = rng.choice( [ 12 * 60, 19 * 60 + 30, 16 * 60 ], linhas, p=[ 0.35, 0.5, 0.15 ] )
+    pedido = np.clip( pico + rng.normal( 0, 120, linhas ), 8 * 60, 23 * 60 + 55 ).astype( np.int64 ) // 5 * 5
+    coleta = ( pedido + rng.choice( [ 5, 10, 15 ], linhas ) ) % ( 24 * 60 )
+
+    clima = _sortear( CLIMAS, linhas, rng )
+    trafego = _sortear( TRAFEGOS, linhas, rng )
+    entregas_multiplas = _sortear( ENTREGAS_MULTIPLAS, linhas, rng )
+    festival = _sortear( FESTIVAIS, linhas, rng )
+    tipo_cidade = _sortear( TIPOS_CIDADE, linhas, rng )
+    condicao = _sortear( CONDICOES_VEICULO, linhas, rng ).astype( np.int64 )
+
+    # Tempo de entrega: distância ( aproximação plana ) + tráfego + clima + festival + entregas múltiplas + ruído
+    distancia = 111.2 * np.hypot( lat_entrega - lat, ( lon_entrega - lon ) * np.cos( np.radians( lat ) ) )
+    tempo = ( 12 + 1.2 * distancia
+              + pd.Series( trafego ).map( ATRASO_TRAFEGO ).to_numpy()
+              + pd.Series( clima ).map( ATRASO_CLIMA ).to_numpy()
+              + np.where( festival == 'Yes ', 18, 0 )
+              + np.where( tipo_cidade == 'Semi-Urban ', 15, 0 )
+              + np.where( condicao == 0, 4, 0 )
+              + 3 * pd.Series( entregas_multiplas ).map( { '0': 0, '1': 1, '2': 2, '3': 3, 'NaN ': 1 } ).to_numpy()
+              + rng.normal( 0, 4, linhas ) )
+    tempo = np.clip( np.round( tempo ), 10, 54 ).astype( np.int64 )
+
+    return pd.DataFrame( {
+        'ID': [ '0x{:x} '.format( i ) for i in range( inicio, inicio + linhas ) ],
+        'Delivery_person_ID': entregador,
+        'Delivery_person_Age': idade,
+        'Delivery_person_Ratings': avaliacao,
+        'Restaurant_latitude': lat,
+        'Restaurant_longitude': lon,
+        'Delivery_location_latitude': lat_entrega,
+        'Delivery_location_longitude': lon_entrega,
+        'Order_Date': datas[ rng.integers( 0, dias, linhas ) ],
+        'Time_Orderd': HORARIOS[ pedido ],
+        'Time_Order_picked': HORARIOS[ coleta ],
+        'Weatherconditions': 'conditions ' + clima,
+        'Road_traffic_density': trafego,
+        'Vehicle_condition': condicao,
+        'Type_of_order': _sortear( TIPOS_PEDIDO, linhas, rng ),
+        'Type_of_vehicle': _sortear( VEICULOS, linhas, rng ),
+        'multiple_deliveries': entregas_multiplas,
+        'Festival': festival,
+        'City': tipo_cidade,
+        'Time_taken(min)': TEMPOS[ tempo ],
+    }, columns=COLUNAS )
+
+def gerar_csv( caminho, linhas, semente=0, tamanho_bloco=TAMANHO_BLOCO_PADRAO, data_inicial=DATA_INICIAL_PADRAO, dias=DIAS_PADRAO ):
+    """Esta função escreve um csv sintético com "linhas" linhas em blocos de "tamanho_bloco" linhas
+
+        A mesma semente ( e o mesmo tamanho de bloco ) gera sempre o mesmo arquivo.
+    """
+    rng = np.random.default_rng( semente )
+    tabela_restaurantes = restaurantes( semente )
+
+    with open( caminho, 'w', newline='' ) as arquivo:
+        for inicio in range( 0, linhas, tamanho_bloco ):
+            bloco = gerar_bloco( inicio, min( tamanho_bloco, linhas - inicio ), rng, tabela_restaurantes, data_inicial, dias )
+            bloco.to_csv( arquivo, index=False, header=( inicio == 0 ) )
+
+    return caminho
+
+def main( argumentos=None ):
+    parser = argparse.ArgumentParser( description='Gera um csv sintético no formato do train.csv' )
+    parser.add_argument( 'saida', help='caminho do csv gerado' )
+    parser.add_argument( '--linhas', type=int, default=1_000_000 )
+    parser.add_argument( '--semente', type=int, default=0 )
+    parser.add_argument( '--data-inicial', default=DATA_INICIAL_PADRAO, help='primeiro dia dos pedidos ( AAAA-MM-DD )' )
+    parser.add_argument( '--dias', type=int, default=DIAS_PADRAO, help='quantidade de dias cobertos pelos pedidos' )
+    parser.add_argument( '--tamanho-bloco', type=int, default=TAMANHO_BLOCO_PADRAO, help='linhas geradas e escritas por vez' )
+    args = parser.parse_args( argumentos )
+
+    gerar_csv( args.saida, args.linhas, args.semente, args.tamanho_bloco, args.data_inicial, args.dias )
+    print( '{}: {:,} linhas, {:,.1f} MB'.format( args.saida, args.linhas, os.path.getsize( args.saida ) / 2**20 ) )
+
+if __name__ == '__main__':
+    main()
@@ -6,135 +6,72 @@ import plotly.express as px
 import folium
 import numpy as np
 import plotly.graph_objects as go
-import geopy.distance
 import streamlit as st
-from haversine import haversine
 from datetime import date
 from PIL import Image
 from streamlit_folium import folium_static
 
+from curry import metricas
+from curry.cache_resultados import memorizar
+from curry.cubo import carregar_cubo
+from curry.figuras import figura, plotly_chart
+from curry.indice import carregar_indice
+from curry.ingestao import CAMINHO_DADOS, carregar_dados
+from curry.ingestao_blocos import MODO_STREAMING, carregar_cubo_agregados
+from curry.instrumentacao import iniciar_execucao, instrumentar, painel_depuracao
+from curry.layout import abas_preguicosas
+from curry.mapa import mapa_calor_entregas
+
 #================================================================================================================================================================
 # Funções
 #================================================================================================================================================================
 
-#==================================================================================================================================================================
-# Limpeza dos dados do dataset
-#==================================================================================================================================================================
-
-def clean_code( df ):
-    """Esta função tem a responsabilidade de limpar o dataframe
-
-        Tipos de limpeza:
-        1. Remoção dos dados NaN
-        2. Mudança do tipo da coluna de dados
-        3. Remoção dos espaços das variáveis de texto
-        4. Formatação da coluna de datas
-        5. Limpeza da coluna de tempo ( Remoção do texto da variável numérica )
-        6. Criação da variável "Distance_km" que mostra a distância geográgica entre o restaurante e o endereço de entrega
-    
-    """
-
-    #1.Fazendo uma cópia do DataFrame Lido
-    df = df_original.copy()
-
-    #2.Removendo o espaço dos valores das colunas
-    df.loc[:, 'Delivery_person_ID'] = df.loc[:, 'Delivery_person_ID'].str.strip()
-    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
-    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
-    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
-    df.loc[:, 'Festival'] = df.loc[:, 'Festival'].str.strip()
-    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
-
-    #3.Excluir as linhas com a idade dos entregadores vazia ( Conceitos de seleção condicional )
-    linhas_vazias = df['Delivery_person_Age'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    linhas_vazias = df['Weatherconditions'] != 'conditions NaN'
-    df = df.loc[linhas_vazias, :]
+# Os números de cada gráfico vêm de curry.metricas; aqui só as figuras são montadas. O JSON de cada figura
+# fica em cache pelos dados agregados ( curry.figuras ): mesmos números, nenhuma figura montada de novo
 
-    #4.Conversao de texto/categoria/string para numeros inteiros
-    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype( int )
+TITULOS_RESOLUCAO = { 'dia': 'Pedidos por dia', 'semana': 'Pedidos por semana', 'mes': 'Pedidos por mês', 'lttb': 'Pedidos por dia ( amostra )' }
 
-    #5.Conversao de texto/categoria/strings para numeros decimais
-    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype( float )
-
-    #6.Conversao de texto para data
-    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format='%d-%m-%Y' )
-
-    #7.Remove as linhas da culuna multiple_deliveries que tenham o conteudo igual a 'NaN '
-    linhas_vazias = df['multiple_deliveries'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-    df['multiple_deliveries'] = df['multiple_deliveries'].astype( int )
-
-    #8. Limpando a coluna de time taken
-    df['Time_taken(min)'] = df['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1] )
-    df['Time_taken(min)']  = df['Time_taken(min)'].astype( int )
-
-    #9.Removendo "conditions " do campo "Weatherconditions"
-    df['Weatherconditions'] = df['Weatherconditions'].str.replace( 'conditions ', '' )
-
-    #10.Criando coluna da distancia entre o restaurante e o endereço de entrega em quilômetros
-    # Opção com Lambda
-    # colunas_selecionadas = [ 'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude' ]
-    # df[ 'Distance_km' ] = ( df.loc[ :, colunas_selecionadas ].apply( lambda x:round( geopy.distance.geodesic( (x['Restaurant_latitude'], x['Restaurant_longitude']), (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ).km, 2) , axis=1) )
-    cols = ['Delivery_location_latitude', 'Delivery_location_longitude', 'Restaurant_latitude', 'Restaurant_longitude']
-    df['Distance_km'] = df.loc[:, cols].apply( lambda x: haversine(  (x['Restaurant_latitude'], x['Restaurant_longitude']), 
-                                                                     (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ), axis=1 )
-
-    return df
-
-def pedidos_dia( df ):
-    cols = ['ID', 'Order_Date']
-    df_aux = df.loc[:, cols].groupby(by = ['Order_Date']).count().reset_index()
-    df_aux.columns = ['Data_Entrega', 'Qtde_Entrega']
+@instrumentar
+@memorizar
+def pedidos_dia( cubo ):
+    """Retorna ( título, figura ): com muitos dias no período os pedidos são somados por semana, mês...
+    ( no máximo MAXIMO_PONTOS barras, ver curry.resolucao )"""
+    df_aux = metricas.pedidos_periodo( cubo )
+    resolucao = df_aux[ 'Resolucao' ].iat[0] if len( df_aux ) else 'dia'
 
     #Criação do gráfico
-    fig = px.bar(df_aux, x = 'Data_Entrega', y = 'Qtde_Entrega')
-
-    return fig
-
-def pedidos_trafego( df ):
-    cols = [ 'ID', 'Road_traffic_density' ]
-    df_aux = df.loc[:, cols].groupby( [ 'Road_traffic_density' ] ).count().reset_index()
-    df_aux['Perc_per_traffic'] = 100 * ( df_aux[ 'ID' ] / df_aux[ 'ID' ].sum() )
-
-    fig = px.pie( df_aux, values='Perc_per_traffic', names='Road_traffic_density' )
-
-    return fig
-
-def pedidos_cidade_trafego( df ):
-    cols = [ 'ID', 'City', 'Road_traffic_density' ]
-    df_aux = df.loc[ :, cols ].groupby( [ 'City', 'Road_traffic_density' ] ).count().reset_index()
-
-    fig = px.scatter( df_aux, x='City', y='Road_traffic_density', size='ID' )
-    return fig
-
-def pedidos_semana( df ):
-    df['Order_Date'] = pd.to_datetime(df.Order_Date, format='%Y-%m-%d')
-    df['Week_Year'] = df['Order_Date'].dt.strftime( "%U" )
-
-    cols = ['ID', 'Week_Year']
-    df_aux = df.loc[:, cols].groupby( ['Week_Year'] ).count().reset_index()
-    df_aux.columns = ['Semana do ano', 'Qtde entrega']
-
-    fig = px.line( df_aux, x = 'Semana do ano', y = 'Qtde entrega' )
-    return fig
-
-def pedidos_entregador_semana( df ):
-    cols1 = [ 'ID', 'Week_Year' ]
-    cols2 = [ 'Delivery_person_ID', 'Week_Year' ]
-    df_aux1 = df.loc[ :, cols1 ].groupby( [ 'Week_Year' ] ).count().reset_index()
-    df_aux2 = df.loc[ :, cols2 ].groupby( [ 'Week_Year' ] ).nunique().reset_index()
-    df_aux = pd.merge( df_aux1, df_aux2, how='inner' )
-
-    df_aux['Order_by_deliver'] = df_aux[ 'ID' ] / df_aux[ 'Delivery_person_ID' ]
-
-    fig = px.line( df_aux, x='Week_Year', y='Order_by_deliver' )
-    return fig
-
+    fig = figura( 'empresas.pedidos_dia', df_aux, lambda df_aux: px.bar( df_aux, x = 'Data_Entrega', y = 'Qtde_Entrega' ) )
+
+    return TITULOS_RESOLUCAO.get( resolucao, 'Pedidos a cada ' + resolucao ), fig
+
+@instrumentar
+@memorizar
+def pedidos_trafego( cubo ):
+    return figura( 'empresas.pedidos_trafego', metricas.pedidos_trafego( cubo ),
+                   lambda df_aux: px.pie( df_aux, values='Perc_per_traffic', names='Road_traffic_density' ) )
+
+@instrumentar
+@memorizar
+def pedidos_cidade_trafego( cubo ):
+    return figura( 'empresas.pedidos_cidade_trafego', metricas.pedidos_cidade_trafego( cubo ),
+                   lambda df_aux: px.scatter( df_aux, x='City', y='Road_traffic_density', size='ID' ) )
+
+@instrumentar
+@memorizar
+def pedidos_semana( cubo ):
+    return figura( 'empresas.pedidos_semana', metricas.pedidos_semana( cubo ),
+                   lambda df_aux: px.line( df_aux, x = 'Semana do ano', y = 'Qtde entrega' ) )
+
+@instrumentar
+@memorizar
+def pedidos_entregador_semana( cubo ):
+    return figura( 'empresas.pedidos_entregador_semana', metricas.pedidos_entregador_semana( cubo ),
+                   lambda df_aux: px.line( df_aux, x='Week_Year', y='Order_by_deliver' ) )
+
+@instrumentar
+@memorizar
 def mapa_localizacao_cidade_trafego( df ):
-    cols = [ 'City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude' ]
-    df_aux = df.loc[ :, cols ].groupby( [ 'City', 'Road_traffic_density' ] ).median().reset_index()
+    df_aux = metricas.localizacao_cidade_trafego( df )
 
     map = folium.Map( zoom_start=11 )
 
@@ -143,20 +80,36 @@ def mapa_localizacao_cidade_trafego( df ):
                         location_info['Delivery_location_longitude'] ],
                         popup=location_info[ [ 'City', 'Road_traffic_density' ] ] ).add_to( map )
     
-    folium_static( map, width=1024, height=600 )
+    return map
+
+@instrumentar
+@memorizar
+def mapa_entregas( df ):
+    # Todas as entregas, agregadas em grade em uma única camada de calor ( payload limitado )
+    map = mapa_calor_entregas( df[ 'Delivery_location_latitude' ], df[ 'Delivery_location_longitude' ] )
+
+    return map
 
 #==========================================================Início da estrutura do código===========================================================================
 #==================================================================================================================================================================
-# Leitura do dataset para as operações
+# Leitura e limpeza do dataset ( em cache, compartilhado entre as páginas )
 #==================================================================================================================================================================
 
-df_original = pd.read_csv('dataset/train.csv')
+# Registros de tempo/memória desta execução ( só com CURRY_INSTRUMENTACAO=1, ver curry.instrumentacao )
+iniciar_execucao( 'visao_empresas' )
 
-#==================================================================================================================================================================
-# Chamada da limpeza dos dados
-#==================================================================================================================================================================
+# Somente as colunas usadas nesta página são lidas do cache colunar ( o mapa usa os dados linha a linha )
+COLUNAS_PAGINA = [ 'Order_Date', 'Road_traffic_density', 'City', 'Delivery_location_latitude', 'Delivery_location_longitude' ]
+
+if MODO_STREAMING:
+    # Modo streaming ( CURRY_STREAMING=1 ): cubo montado dos agregados, sem carregar o dataset limpo ( sem os mapas )
+    cubo = carregar_cubo_agregados( CAMINHO_DADOS )
+else:
+    df = carregar_dados( CAMINHO_DADOS, colunas=COLUNAS_PAGINA )
+    indice = carregar_indice( CAMINHO_DADOS )
 
-df = clean_code( df_original )
+    # Contagens por dia x cidade x tráfego, calculadas uma única vez ( gráficos das abas Gerencial e Tática )
+    cubo = carregar_cubo( CAMINHO_DADOS )
 
 #==================================================================================================================================================================
 # Barra Lateral - Streamlit
@@ -191,51 +144,67 @@ vTrafego_select = st.sidebar.multiselect(
 st.sidebar.markdown( """---""" )
 st.sidebar.markdown( '### Powered by Comunidade DS' )
 
-# Filtro de data
-linhas_selecionadas = df['Order_Date'] < vDataPedido_slider
-df = df.loc[ linhas_selecionadas, : ]
+# Filtros de data e de transito ( busca binária na data + posições pré-calculadas de cada tráfego )
+if not MODO_STREAMING:
+    df = indice.filtrar( df, vDataPedido_slider, vTrafego_select )
 
-# Filtro de transito
-linhas_selecionadas = df['Road_traffic_density'].isin( vTrafego_select )
-df = df.loc[ linhas_selecionadas, : ]
+# Os mesmos filtros aplicados ao cubo de pedidos
+cubo = cubo.fatiar( vDataPedido_slider, vTrafego_select )
 
 # st.dataframe( df )
 
 # #==================================================================================================================================================================
 # # Layout Page - Streamlit
 # #==================================================================================================================================================================
-tab1, tab2, tab3 = st.tabs( [ 'Visão Gerencial', 'Visão Tática', 'Visão Geográfica' ] )
+# Renderização medida pela instrumentação ( a própria função do Streamlit quando desligada )
+plotly_chart = instrumentar( plotly_chart, 'render.plotly_chart' )
+folium_static = instrumentar( folium_static, 'render.folium_static' )
 
-with tab1:
+# Somente a aba selecionada é montada ( ver curry.layout )
+vAba = abas_preguicosas( [ 'Visão Gerencial', 'Visão Tática', 'Visão Geográfica' ], chave='abas_empresas' )
+
+if vAba == 'Visão Gerencial':
     with st.container():
-        fig = pedidos_dia( df )
-        st.markdown( '### Pedidos por dia' )
-        st.plotly_chart( fig, use_container_width=True )
+        titulo, fig = pedidos_dia( cubo )
+        st.markdown( '### ' + titulo )
+        plotly_chart( fig, use_container_width=True )
 
     with st.container():
         col1, col2 = st.columns( 2 )
 
         with col1:
             st.markdown( '### Pedidos por semana.' )
-            fig = pedidos_trafego( df )
-            st.plotly_chart( fig )
+            fig = pedidos_trafego( cubo )
+            plotly_chart( fig )
         
         with col2:
             st.markdown( 'Comparação do volume de pedidos por cidade e tipo de tráfego' )
-            fig = pedidos_cidade_trafego( df )
-            st.plotly_chart( fig )
+            fig = pedidos_cidade_trafego( cubo )
+            plotly_chart( fig )
 
-with tab2:
+elif vAba == 'Visão Tática':
     with st.container():
         st.markdown( '## Pedidos por semana' )
-        fig = pedidos_semana( df )
-        st.plotly_chart( fig, use_container_width=True )
+        fig = pedidos_semana( cubo )
+        plotly_chart( fig, use_container_width=True )
 
     with st.container():
         st.markdown( '## Quantidade de pedidos por entregador por semana' )
-        fig = pedidos_entregador_semana( df )
-        st.plotly_chart( fig, use_container_width=True )
+        fig = pedidos_entregador_semana( cubo )
+        plotly_chart( fig, use_container_width=True )
+
+elif vAba == 'Visão Geográfica' and MODO_STREAMING:
+    st.info( 'Os mapas precisam das entregas linha a linha e não estão disponíveis no modo streaming ( CURRY_STREAMING ).' )
+
+elif vAba == 'Visão Geográfica':
+    vTipoMapa = st.radio( 'Tipo de mapa', [ 'Localização central', 'Todas as entregas' ], horizontal=True )
+
+    if vTipoMapa == 'Localização central':
+        st.markdown( '## Localização central de cada cidade por tipo de tráfego' )
+        folium_static( mapa_localizacao_cidade_trafego( df ), width=1024, height=600 )
+
+    else:
+        st.markdown( '## Concentração de entregas' )
+        folium_static( mapa_entregas( df ), width=1024, height=600 )
 
-with tab3:
-    st.markdown( '## Localização central de cada cidade por tipo de tráfego' )
-    mapa_localizacao_cidade_trafego( df )
\ No newline at end of file
+painel_depuracao()
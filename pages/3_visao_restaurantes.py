@@ -6,163 +6,81 @@ import plotly.express as px
 import folium
 import numpy as np
 import plotly.graph_objects as go
-import geopy.distance
 import streamlit as st
-from haversine import haversine
 from datetime import date
 from PIL import Image
 from streamlit_folium import folium_static
 
+from curry.cache_resultados import memorizar
+from curry.cubo import carregar_cubo
+from curry.espacial import carregar_indices_espaciais
+from curry.figuras import figura, plotly_chart
+from curry.indice import carregar_indice
+from curry.ingestao import CAMINHO_DADOS, carregar_dados
+from curry.ingestao_blocos import MODO_STREAMING, carregar_agregados, carregar_cubo_agregados
+from curry.instrumentacao import iniciar_execucao, instrumentar, painel_depuracao
+from curry.layout import abas_preguicosas
+from curry.metricas import calc_metricas_gerais, calc_tempo_medio_dp_cidade, entregadores_unicos
+
 #================================================================================================================================================================
 # Funções
 #================================================================================================================================================================
 
-#==================================================================================================================================================================
-# Limpeza dos dados do dataset
-#==================================================================================================================================================================
-
-def clean_code( df ):
-    """Esta função tem a responsabilidade de limpar o dataframe
-
-        Tipos de limpeza:
-        1. Remoção dos dados NaN
-        2. Mudança do tipo da coluna de dados
-        3. Remoção dos espaços das variáveis de texto
-        4. Formatação da coluna de datas
-        5. Limpeza da coluna de tempo ( Remoção do texto da variável numérica )
-        6. Criação da variável "Distance_km" que mostra a distância geográgica entre o restaurante e o endereço de entrega
-    
-    """
-
-    #1.Fazendo uma cópia do DataFrame Lido
-    df = df_original.copy()
-
-    #2.Removendo o espaço dos valores das colunas
-    df.loc[:, 'Delivery_person_ID'] = df.loc[:, 'Delivery_person_ID'].str.strip()
-    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
-    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
-    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
-    df.loc[:, 'Festival'] = df.loc[:, 'Festival'].str.strip()
-    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
-
-    #3.Excluir as linhas com a idade dos entregadores vazia ( Conceitos de seleção condicional )
-    linhas_vazias = df['Delivery_person_Age'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    linhas_vazias = df['Weatherconditions'] != 'conditions NaN'
-    df = df.loc[linhas_vazias, :]
-
-    linhas_selecionadas = (df['Delivery_person_Age'] != 'NaN ') 
-    df = df.loc[linhas_selecionadas, :].copy()
-
-    linhas_selecionadas = (df['Road_traffic_density'] != 'NaN ') 
-    df = df.loc[linhas_selecionadas, :].copy()
-
-    linhas_selecionadas = (df['City'] != 'NaN') 
-    df = df.loc[linhas_selecionadas, :].copy()
+# Os números de cada gráfico vêm de curry.metricas; aqui só as figuras são montadas. O JSON de cada figura
+# fica em cache pelos dados agregados ( curry.figuras ): mesmos números, nenhuma figura montada de novo
 
-    linhas_selecionadas = (df['Festival'] != 'NaN ') 
-    df = df.loc[linhas_selecionadas, :].copy()
+def _barras_tempo_medio( df2 ):
+    fig = go.Figure()
+    fig.add_trace( go.Bar( name='Control', x=df2[ 'City' ], y=df2[ 'Tempo_Médio_Entrega' ], error_y=dict( type='data', array=df2[ 'Desvio_Padrão' ] ) ) )
+    fig.update_layout( barmode='group' )
 
-    #4.Conversao de texto/categoria/string para numeros inteiros
-    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype( int )
+    return fig
 
-    #5.Conversao de texto/categoria/strings para numeros decimais
-    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype( float )
+def _solar_tempo_medio( df2 ):
+    # O px.sunburst não aceita colunas categóricas no path ( astype gera uma cópia do resultado compartilhado )
+    df2 = df2.astype( { 'City': str, 'Road_traffic_density': str } )
+    fig = px.sunburst( df2
+                    , path=[ 'City', 'Road_traffic_density' ]
+                        , values='Tempo_Médio_Entrega'
+                        , color='Desvio_Padrão'
+                        , color_continuous_scale='RdBu'
+                        , color_continuous_midpoint=np.average( df2[ 'Desvio_Padrão' ] ) )
 
-    #6.Conversao de texto para data
-    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format='%d-%m-%Y' )
+    return fig
 
-    #7.Remove as linhas da culuna multiple_deliveries que tenham o conteudo igual a 'NaN '
-    linhas_vazias = df['multiple_deliveries'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-    df['multiple_deliveries'] = df['multiple_deliveries'].astype( int )
+def _pizza_distancia( df2 ):
+    return go.Figure( data=[ go.Pie( labels=df2['City'], values=df2['Distance_km'], pull=[ 0, 0.1 ] ) ] )
 
-    #8. Limpando a coluna de time taken
-    df['Time_taken(min)'] = df['Time_taken(min)'].apply( lambda x: x.split( '(min) ')[1] )
-    df['Time_taken(min)']  = df['Time_taken(min)'].astype( int )
-
-    #9.Removendo "conditions " do campo "Weatherconditions"
-    df['Weatherconditions'] = df['Weatherconditions'].str.replace( 'conditions ', '' )
-
-    #10.Criando coluna da distancia entre o restaurante e o endereço de entrega em quilômetros
-    # Opção com Lambda
-    # colunas_selecionadas = [ 'Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude' ]
-    # df[ 'Distance_km' ] = ( df.loc[ :, colunas_selecionadas ].apply( lambda x:round( geopy.distance.geodesic( (x['Restaurant_latitude'], x['Restaurant_longitude']), (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ).km, 2) , axis=1) )
-    cols = ['Delivery_location_latitude', 'Delivery_location_longitude', 'Restaurant_latitude', 'Restaurant_longitude']
-    df['Distance_km'] = df.loc[:, cols].apply( lambda x: haversine(  (x['Restaurant_latitude'], x['Restaurant_longitude']), 
-                                                                     (x['Delivery_location_latitude'], x['Delivery_location_longitude']) ), axis=1 )
-
-
-    return df
-
-def calc_tempo_medio_dp_cidade( df, tp_grafico ):
-    if tp_grafico == 'barras':
-        cols = [ 'Time_taken(min)', 'City' ]
-        df2 = df.loc[ :, cols ].groupby( ['City'] ).agg( Tempo_Médio_Entrega = ('Time_taken(min)', 'mean'), Desvio_Padrão = ('Time_taken(min)', 'std') ).reset_index()
-        fig = go.Figure()
-        fig.add_trace( go.Bar( name='Control', x=df2[ 'City' ], y=df2[ 'Tempo_Médio_Entrega' ], error_y=dict( type='data', array=df2[ 'Desvio_Padrão' ] ) ) )
-        fig.update_layout( barmode='group' )
-
-        return fig
-    
-    elif tp_grafico == 'solar':
-        cols = [ 'Time_taken(min)', 'City', 'Road_traffic_density' ]
-        df2 = (df.loc[ :, cols ].groupby( ['City', 'Road_traffic_density'] )
-                                .agg( Tempo_Médio_Entrega = ('Time_taken(min)', 'mean'), Desvio_Padrão = ('Time_taken(min)', 'std') )
-                                .reset_index() )
-        fig = px.sunburst( df2
-                        , path=[ 'City', 'Road_traffic_density' ]
-                            , values='Tempo_Médio_Entrega'
-                            , color='Desvio_Padrão'
-                            , color_continuous_scale='RdBu'
-                            , color_continuous_midpoint=np.average( df2[ 'Desvio_Padrão' ] ) )
-        
-        return fig
-    
-    elif tp_grafico == 'pizza':
-        cols = [ 'Distance_km', 'City' ]
-        df1 = df.loc[ :, cols ].groupby( ['City'] ).mean().reset_index()
-        fig = go.Figure( data=[ go.Pie( labels=df1['City'], values=df1['Distance_km'], pull=[ 0, 0.1 ] ) ] )
-
-        return fig
-    
-    elif tp_grafico == 'tabela':
-        cols = [ 'Time_taken(min)', 'City', 'Type_of_order' ]
-        df2 = ( df.loc[ :, cols ].groupby( ['City', 'Type_of_order'] )
-                                 .agg( Tempo_Médio_Entrega = ('Time_taken(min)', 'mean'), Desvio_Padrão = ('Time_taken(min)', 'std') )
-                                 .reset_index() )
-        return df2
-
-def calc_tempo_medio_dv_festival( df, festival, tp_operacao ):
-    if festival == 'sim':
-        op_fest = 'Yes'
-    
-    elif festival == 'nao':
-        op_fest = 'No'
-    
-    if tp_operacao == 'media':
-        v_test = df.loc[ ( df['Festival'] == op_fest ), [ 'Time_taken(min)' ] ].mean()
-        v_test = round( v_test.astype(float), 2)
+GRAFICOS_TEMPO_MEDIO = { 'barras': _barras_tempo_medio, 'solar': _solar_tempo_medio, 'pizza': _pizza_distancia }
 
-    elif tp_operacao == 'desvio padrao':
-        v_test = df.loc[ ( df['Festival'] == op_fest ), [ 'Time_taken(min)' ] ].std()
-        v_test = round( v_test.astype(float), 2)
-    
-    return v_test
+@instrumentar
+@memorizar
+def grafico_tempo_medio_dp_cidade( df, tp_grafico ):
+    return figura( 'restaurantes.tempo_medio_dp_cidade.' + tp_grafico, calc_tempo_medio_dp_cidade( df, tp_grafico ),
+                   GRAFICOS_TEMPO_MEDIO[ tp_grafico ] )
 
 #==========================================================Início da estrutura do código===========================================================================
 #==================================================================================================================================================================
-# Leitura do dataset para as operações
+# Leitura e limpeza do dataset ( em cache, compartilhado entre as páginas )
 #==================================================================================================================================================================
 
-df_original = pd.read_csv('dataset/train.csv')
+# Registros de tempo/memória desta execução ( só com CURRY_INSTRUMENTACAO=1, ver curry.instrumentacao )
+iniciar_execucao( 'visao_restaurantes' )
 
-#==================================================================================================================================================================
-# Chamada da limpeza dos dados
-#==================================================================================================================================================================
+# Somente as colunas usadas nesta página são lidas do cache colunar
+COLUNAS_PAGINA = [ 'Order_Date', 'Road_traffic_density', 'City', 'Distance_km', 'Festival', 'Type_of_order', 'Time_taken(min)' ]
 
-df = clean_code( df_original )
+if MODO_STREAMING:
+    # Modo streaming ( CURRY_STREAMING=1 ): métricas e cubo vêm dos agregados, sem carregar o dataset limpo ( sem a busca geográfica )
+    agregados = carregar_agregados( CAMINHO_DADOS )
+    cubo = carregar_cubo_agregados( CAMINHO_DADOS )
+else:
+    df = carregar_dados( CAMINHO_DADOS, colunas=COLUNAS_PAGINA )
+    indice = carregar_indice( CAMINHO_DADOS )
+    indices_espaciais = carregar_indices_espaciais( CAMINHO_DADOS )
+
+    # Esboços dos entregadores por dia x cidade x tráfego ( entregadores únicos do cabeçalho, ver curry.hll )
+    cubo = carregar_cubo( CAMINHO_DADOS )
 
 # #==================================================================================================================================================================
 # # Barra Lateral - Streamlit
@@ -198,52 +116,61 @@ vTrafego_select = st.sidebar.multiselect(
 st.sidebar.markdown( """---""" )
 st.sidebar.markdown( '### Powered by Comunidade DS' )
 
-# Filtro de data
-linhas_selecionadas = df['Order_Date'] < vDataPedido_slider
-df = df.loc[ linhas_selecionadas, : ]
+# Filtros de data e de transito ( busca binária na data + posições pré-calculadas de cada tráfego )
+if MODO_STREAMING:
+    df = agregados.fatiar( vDataPedido_slider, vTrafego_select )
+else:
+    df = indice.filtrar( df, vDataPedido_slider, vTrafego_select )
 
-# Filtro de transito
-linhas_selecionadas = df['Road_traffic_density'].isin( vTrafego_select )
-df = df.loc[ linhas_selecionadas, : ]
+# Os mesmos filtros aplicados ao cubo de pedidos
+cubo = cubo.fatiar( vDataPedido_slider, vTrafego_select )
 
 # st.dataframe( df )
 
 # #==================================================================================================================================================================
 # # Layout Page - Streamlit
 # #==================================================================================================================================================================
-tab1, tab2, tab3 = st.tabs( ['Visão Gerencial', '---', '---'] )
+# Renderização medida pela instrumentação ( a própria função do Streamlit quando desligada )
+plotly_chart = instrumentar( plotly_chart, 'render.plotly_chart' )
+dataframe = instrumentar( st.dataframe, 'render.dataframe' )
+
+# Somente a aba selecionada é montada ( ver curry.layout )
+vAba = abas_preguicosas( [ 'Visão Gerencial', 'Visão Geográfica', '---' ], chave='abas_restaurantes' )
 
-with tab1:
+if vAba == 'Visão Gerencial':
     with st.container():
         st.header( 'Métricas Gerais' )
 
         col1, col2, col3, col4, col5, col6 = st.columns( 6, gap='large' )
 
+        # As métricas de tempo e distância vêm de uma única agregação; os entregadores, da combinação dos esboços
+        metricas = calc_metricas_gerais( df )
+        entregadores = entregadores_unicos( cubo )
+
         with col1:
-            v_qtd_entreg_unicos = df[ 'Delivery_person_ID' ].nunique()
-            st.metric( 'Entregadores Únicos', v_qtd_entreg_unicos )
+            st.metric( 'Entregadores Únicos', entregadores[ 'entregadores_unicos' ],
+                       help=None if entregadores[ 'exato' ] else 'Estimativa HyperLogLog ( erro padrão de {:.1%} )'.format( entregadores[ 'erro_padrao' ] ) )
         
         with col2:
-            v_media_dist = round( df[ 'Distance_km' ].mean(), 2 )
-            st.metric( 'Distância média (km)', v_media_dist )
+            st.metric( 'Distância média (km)', metricas[ 'distancia_media' ] )
 
         with col3:
-            st.metric( 'Média c/ Festival(min)', calc_tempo_medio_dv_festival( df, 'sim', 'media' ) )
+            st.metric( 'Média c/ Festival(min)', metricas[ 'sim' ][ 'media' ] )
 
         with col4:
-            st.metric( 'Desv. Pad. c/ Festival(min)', calc_tempo_medio_dv_festival( df, 'sim', 'desvio padrao' ) )
+            st.metric( 'Desv. Pad. c/ Festival(min)', metricas[ 'sim' ][ 'desvio_padrao' ] )
 
         with col5:
-            st.metric( 'Média s/ Festival(min)', calc_tempo_medio_dv_festival( df, 'nao', 'media' ) )
+            st.metric( 'Média s/ Festival(min)', metricas[ 'nao' ][ 'media' ] )
 
         with col6:
-            st.metric( 'Desv. Pad. s/ Festival(min)', calc_tempo_medio_dv_festival( df, 'nao', 'desvio padrao' ) )
+            st.metric( 'Desv. Pad. s/ Festival(min)', metricas[ 'nao' ][ 'desvio_padrao' ] )
     
     with st.container():
         st.divider()
         st.markdown( '### Tempo médio e desvio padrão por cidade' )
-        fig = calc_tempo_medio_dp_cidade( df, 'barras' )
-        st.plotly_chart( fig, use_container_width=True )
+        fig = grafico_tempo_medio_dp_cidade( df, 'barras' )
+        plotly_chart( fig, use_container_width=True )
 
     with st.container():
         st.divider()
@@ -251,20 +178,58 @@ with tab1:
         
         with col1:
             st.markdown( '### Tempo médio de entrega por cidade' )
-            fig = calc_tempo_medio_dp_cidade( df, 'pizza' )
-            st.plotly_chart( fig )
+            fig = grafico_tempo_medio_dp_cidade( df, 'pizza' )
+            plotly_chart( fig )
 
         with col2:
             st.markdown( '### Tempo médio e desvio padrão por cidade - Sunburst' )
-            fig = calc_tempo_medio_dp_cidade( df, 'solar' )
-            st.plotly_chart( fig )
+            fig = grafico_tempo_medio_dp_cidade( df, 'solar' )
+            plotly_chart( fig )
 
     with st.container():
         st.divider()
         st.markdown( '### Tempo médio e desvio padrão por cidade e tipo de pedido' )
-        st.dataframe( calc_tempo_medio_dp_cidade( df, 'tabela' ) )
+        dataframe( calc_tempo_medio_dp_cidade( df, 'tabela' ) )
 
-with tab2:
+elif vAba == 'Visão Geográfica' and MODO_STREAMING:
+    st.info( 'A busca geográfica precisa das entregas linha a linha e não está disponível no modo streaming ( CURRY_STREAMING ).' )
+
+elif vAba == 'Visão Geográfica':
+    st.header( 'Busca geográfica' )
+
+    vTipoBusca = st.radio( 'Tipo de busca', [ 'Entregas próximas a um restaurante', 'Restaurantes mais próximos de um endereço' ], horizontal=True )
+
+    col1, col2, col3 = st.columns( 3, gap='large' )
+
+    if vTipoBusca == 'Entregas próximas a um restaurante':
+        restaurante = indices_espaciais.dados.iloc[ indices_espaciais.restaurantes.posicoes[0] ]
+
+        with col1:
+            vLatitude = st.number_input( 'Latitude do restaurante', value=float( restaurante[ 'Restaurant_latitude' ] ), format='%.6f' )
+        with col2:
+            vLongitude = st.number_input( 'Longitude do restaurante', value=float( restaurante[ 'Restaurant_longitude' ] ), format='%.6f' )
+        with col3:
+            vRaio = st.slider( 'Raio (km)', min_value=0.5, max_value=50.0, value=5.0, step=0.5 )
+
+        # Somente as entregas dentro dos filtros da barra lateral
+        df_raio = indices_espaciais.entregas_no_raio( vLatitude, vLongitude, vRaio, indice.posicoes( vDataPedido_slider, vTrafego_select ) )
+
+        st.metric( 'Entregas no raio', len( df_raio ) )
+        dataframe( df_raio )
+
+    else:
+        entrega = indices_espaciais.dados.iloc[0]
+
+        with col1:
+            vLatitude = st.number_input( 'Latitude do endereço', value=float( entrega[ 'Delivery_location_latitude' ] ), format='%.6f' )
+        with col2:
+            vLongitude = st.number_input( 'Longitude do endereço', value=float( entrega[ 'Delivery_location_longitude' ] ), format='%.6f' )
+        with col3:
+            vQtdeRestaurantes = st.slider( 'Quantidade de restaurantes', min_value=1, max_value=20, value=5 )
+
+        dataframe( indices_espaciais.restaurantes_mais_proximos( vLatitude, vLongitude, vQtdeRestaurantes ) )
+
+else:
     st.divider()
-with tab3:
-    st.divider()
\ No newline at end of file
+
+painel_depuracao()